@@ -1,21 +1,28 @@
+from __future__ import annotations
 from modules.base.pluginbase import PluginBase
 from modules.base.configbase import ConfigBase
 from misc.constants import Constants
-from misc.connection import Connection
 import os
-from typing import List, Any
-from ePiframe_service import Service
+from typing import List, Any, TYPE_CHECKING
 from misc.configproperty import ConfigProperty
-from misc.logs import Logs
-from modules.backendmanager import BackendManager
-from modules.base.configbase import ConfigBase
-from modules.convertmanager import ConvertManager
-from modules.filteringmanager import FilteringManager
-from modules.indexmanager import IndexManager
-from modules.photomanager import PhotoManager
-from modules.pidmanager import PIDManager
-from modules.usersmanager import UsersManager
-from modules.webuimanager import WebUIManager
+
+## Modules below are only used in type hints of the hooks, importing them at start would make
+## ePiframe service and WebUI start slower with every plugin (also for hooks that are not used).
+## With postponed annotations (first import above) they are only needed by type checkers and IDEs.
+## Import modules and heavy libraries (PIL, Flask, requests, etc.) needed at runtime inside the hooks
+## that use them, e.g. from modules.webuimanager import WebUIManager in extend_api, so they load on the first call.
+## Check plugin import time with benchmarks/importtime.py (docs/SETUP.md, Benchmarks section).
+if TYPE_CHECKING:
+    from ePiframe_service import Service
+    from misc.logs import Logs
+    from modules.backendmanager import BackendManager
+    from modules.convertmanager import ConvertManager
+    from modules.filteringmanager import FilteringManager
+    from modules.indexmanager import IndexManager
+    from modules.photomanager import PhotoManager
+    from modules.pidmanager import PIDManager
+    from modules.usersmanager import UsersManager
+    from modules.webuimanager import WebUIManager
 
 
 # Main ePiframe plugin template class
@@ -38,6 +45,7 @@ class Plugin(PluginBase):
             ## This structure allows validation, conversion, dependencies, value and type verification and more.
             ## Check https://github.com/MikeGawi/ePiframe/blob/master/modules/configmanager.py
             ## and https://github.com/MikeGawi/ePiframe/blob/master/misc/configproperty.py
+            ## (checkfunction example needs: from misc.connection import Connection)
             self.SETTINGS = [
                 ## this setting is required!
                 ConfigProperty(
@@ -82,6 +90,18 @@ class Plugin(PluginBase):
         super().__init__(path, pid_manager, logging, global_config)
         ## ...
 
+        ## Optional hooks profiling with hookprofiler.py helper shipped with this template (opt-in):
+        ## every implemented hook call is measured (wall time, CPU time) and logged, trace_memory=True adds
+        ## tracemalloc memory peak but makes every allocation slower, so the timings are higher with it
+        # from plugins.<plugin_name>.hookprofiler import HookProfiler
+        # self.profiler = HookProfiler(self, size=100, trace_memory=False) #keeps last 100 calls
+        # self.profiler.install()
+
+        ## Optional non-blocking WebUI actions with actionexecutor.py helper shipped with this template:
+        ## slow add_action functions run in the background, repeated clicks don't start them again
+        # from plugins.<plugin_name>.actionexecutor import ActionExecutor
+        # self.actions = ActionExecutor(self.logging, workers=2) #at most 2 actions running at once
+
     ## Hints:
     ## Use global constants with Constants.<variable name> - check https://github.com/MikeGawi/ePiframe/blob/master/misc/constants.py
     ## Put something to logs with self.logging.log('<text>')
@@ -118,6 +138,14 @@ class Plugin(PluginBase):
     # self.SOURCE = "'{}' plugin source".format(self.name) #it is required to set the source name
     # photos[source_label] = self.SOURCE
     # return photos
+
+    ## example 3 (big sources - build DataFrame with sourcebuilder.py helper shipped with this template,
+    ## directory is streamed to arrays without intermediate lists and source column is categorical):
+    # from plugins.<plugin_name>.sourcebuilder import SourceBuilder
+    # self.SOURCE = "'{}' plugin source".format(self.name) #it is required to set the source name
+    # builder = SourceBuilder(id_label, creation_label, source_label, self.SOURCE)
+    # return builder.from_directory('path_to_photos', Constants.EXTENSIONS)
+    ## or for collected ids and dates (datetime64, timestamps or texts): return builder.from_arrays(files, dates)
     ## Creation time must be in YYYY-mm-ddTHH:MM:SSZ, i.e. 2021-01-27T22:59:37Z format!
     ## Remember to save source name to self.SOURCE variable as it will indicate the source plugin.
     ## Reference: https://github.com/MikeGawi/ePiframe/blob/master/modules/localsourcemanager.py
@@ -149,12 +177,32 @@ class Plugin(PluginBase):
     # shutil.copy(photo[id_label], returned_filename)
     # return returned_filename
 
+    ## example 1b (the same with formatcache.py helper shipped with this template - format is sniffed from file header
+    ## and cached, ImageMagick is started only for unknown formats, copy is made with reflink where possible):
+    ## in __init__: self.format_cache = FormatCache(os.path.join(self.path, 'formats.db'), self.global_config.get('convert_bin_path'), Constants.FIRST_FRAME_GIF)
+    # returned_filename = filename
+    # image_type = self.format_cache.get_format(photo[id_label])
+    # if image_type:
+    # 	returned_filename = filename + "." + Constants.TYPE_TO_EXTENSION[Constants.MIME_START + image_type.lower()]
+    # returned_filename = os.path.join(path, returned_filename)
+    # FormatCache.copy_file(photo[id_label], returned_filename)
+    # return returned_filename
+
     ## example 2 (this source gets photo MIME type /can be converted to extension name with constants/ and download URL so create a filename and download the file):
     # returned_filename = filename + "." + Constants.TYPE_TO_EXTENSION[photo['MIMETYPE_HEADER']]
     # download_url = photo['URL']
     # connection.download_file(download_url, path, returned_filename, Constants.OK_STATUS_ERRORCODE, Constants.CHECK_CONNECTION_TIMEOUT)
     # return returned_filename
 
+    ## example 3 (remote source with downloadmanager.py helper shipped with this template - next photos are downloaded
+    ## in the background with pooled keep-alive connections to size-bounded LRU disk cache, so this returns at once):
+    ## in __init__: self.download_manager = DownloadManager(os.path.join(self.path, 'cache'), 200 * 1024 * 1024, logging=self.logging)
+    ## in change_photos_list: self.download_manager.prefetch([(row.ID, row.URL) for row in next_photos.itertuples()])
+    # import shutil
+    # returned_filename = os.path.join(path, filename + "." + Constants.TYPE_TO_EXTENSION[photo['MIMETYPE_HEADER']])
+    # shutil.copyfile(self.download_manager.get(photo[id_label], photo['URL']), returned_filename) #optional checksum as 3rd argument
+    # return returned_filename
+
     ## ---------------------------------------------------------------------------------------------------------------------------
 
     ## Uncomment and override when final photos list that will be used for picking a photo needs to be changed, e.g. sorted, filtered, turned upside-down, etc.
@@ -174,6 +222,13 @@ class Plugin(PluginBase):
     # ):
     ## example (sort photo_list descendingly by creation time):
     # return photo_list.sort_values(by = creation_label, ascending = False)
+    ## example for big lists (listtransforms.py helper shipped with this template - one reordering copy, index is reset):
+    # from plugins.<plugin_name>.listtransforms import ListTransforms
+    # return ListTransforms.reorder(photo_list, ListTransforms.get_order(photo_list, creation_label, descending=True))
+    ## example (iterate through photos of this plugin source without copying the list, instead of filtering and iterrows()):
+    # mask = ListTransforms.get_mask(photo_list, source_label, self.SOURCE)
+    # for photo_id, creation_time in ListTransforms.iterate(photo_list, [id_label, creation_label], mask):
+    #     ...
     ## Creation time must be in YYYY-mm-ddTHH:MM:SSZ, i.e. 2021-01-27T22:59:37Z format!
     ## It's good to reset the records indexing after sorting with photo_manager.reset_index(photo_list)
     ## Reference: https://github.com/MikeGawi/ePiframe/blob/master/modules/filteringmanager.py
@@ -242,6 +297,19 @@ class Plugin(PluginBase):
     # image.save(final_photo)
     ## Reference: https://github.com/MikeGawi/ePiframe/blob/master/modules/weathermanager.py
 
+    ## example with imagechain.py helper shipped with this template - image variant of the hook takes and returns
+    ## decoded PIL image, so when the hook of all plugins is run with ImageChain.run_hook the photo is decoded and saved once
+    ## (preprocess_image works the same way with preprocess_photo arguments):
+    # def postprocess_image(self, image, width: int, height: int, is_horizontal: bool, convert_manager: ConvertManager, photo, id_label: str, creation_label: str, source_label: str):
+    # from PIL import ImageDraw
+    # draw = ImageDraw.Draw(image)
+    # draw.text((1, 100), 'text')
+    # return image
+    ## and path based hook (called by ePiframe) uses it with one decode and save:
+    # def postprocess_photo(self, final_photo: str, width: int, height: int, is_horizontal: bool, convert_manager: ConvertManager, photo, id_label: str, creation_label: str, source_label: str):
+    # from plugins.<plugin_name>.imagechain import ImageChain
+    # ImageChain.process_file(final_photo, lambda image: self.postprocess_image(image, width, height, is_horizontal, convert_manager, photo, id_label, creation_label, source_label))
+
     ## ---------------------------------------------------------------------------------------------------------------------------
 
     ## Uncomment and override extend_api method when need to extend API functions, e.g. new data returned by query/website like get hardware statistics, expose API for smart home server, etc.
@@ -271,6 +339,16 @@ class Plugin(PluginBase):
     # data = db_connection.get_data_from_query(request.args.get('query'))
     # return jsonify(data_label=data)
 
+    ## the same with querymanager.py helper shipped with this template - pooled SQLite connections, only named queries
+    ## with bound parameters, results cached with TTL until write query, streamed JSON for big results. In __init__:
+    # from plugins.<plugin_name>.querymanager import QueryManager
+    # self.queries = QueryManager(os.path.join(self.path, 'data.db'), {
+    # 	'readings': QueryManager.Query('SELECT time, value FROM readings WHERE sensor = :sensor LIMIT :limit', {'limit': int}),
+    # 	'history': QueryManager.Query('SELECT * FROM readings ORDER BY time', streamed=True), #not loaded to memory at once
+    # })
+    ## and in extend_api instead of the method above (called with /api/get_data?query=readings&sensor=outside&limit=10):
+    # WebUIManager.SiteBind('/api/get_data', login_required(self.queries.get_data_func))
+
     ## This is the plugin method that is fired:
     # def extend_api(
     #         self,
@@ -278,10 +356,15 @@ class Plugin(PluginBase):
     #         users_manager: UsersManager,
     #         backend: BackendManager,
     # ):
+    # from modules.webuimanager import WebUIManager
     # new_apis = [
     # 	WebUIManager.SiteBind('/api/get_text/<text>', self.get_text_func),
     # 	WebUIManager.SiteBind('/api/get_data', self.get_data_func)
     # ]
+    ## hooks profiler JSON stats (if enabled in __init__), user login is needed to get the data
+    # new_apis.append(WebUIManager.SiteBind('/api/<plugin_name>_hook_stats', login_required(self.profiler.get_stats_func)))
+    ## background actions status (if enabled in __init__) called with /api/<plugin_name>_action_status?action=<action> or ?id=<job ID>
+    # new_apis.append(WebUIManager.SiteBind('/api/<plugin_name>_action_status', login_required(self.actions.get_status_func)))
     # return new_apis
 
     ## ---------------------------------------------------------------------------------------------------------------------------
@@ -303,6 +386,7 @@ class Plugin(PluginBase):
     #         backend: BackendManager,
     # ):
     ## example (add new website 'Test' with link to '<IP>/test'in WebUI menu):
+    # from modules.webuimanager import WebUIManager
     # from plugins.<plugin_name>.<website_name> import <website_name>_bp
     # menus = [ WebUIManager.MenuEntry ('Test', '/test', 'test-menu', 'bi bi-apple') ] #can be more than one
     # web_manager.add_menu_entries(menus) #optional
@@ -363,12 +447,20 @@ class Plugin(PluginBase):
     #         users_manager: UsersManager,
     #         backend: BackendManager,
     # ):
+    # from modules.webuimanager import WebUIManager
     # new_actions = {
     # 	'lighton' : WebUIManager.ActionEntry('Turn Light On', self.light_on, 'bi bi-lightbulb-fill', 'lighton'),
     # 	'lightoff' : WebUIManager.ActionEntry('Turn Light Off', self.light_off, 'bi bi-lightbulb', 'lightoff'),
     # }
     # return new_actions
 
+    ## the same with actionexecutor.py helper (if enabled in __init__) - WebUI gets job ID at once instead of waiting
+    ## for the device, the action function can take progress argument to report its progress to the status API
+    # new_actions = {
+    # 	'lighton' : WebUIManager.ActionEntry('Turn Light On', self.actions.wrap('lighton', self.light_on), 'bi bi-lightbulb-fill', 'lighton'),
+    # 	'lightoff' : WebUIManager.ActionEntry('Turn Light Off', self.actions.wrap('lightoff', self.light_off), 'bi bi-lightbulb', 'lightoff'),
+    # }
+
     ## ---------------------------------------------------------------------------------------------------------------------------
 
     ## Uncomment and override when need to add new thread to ePiframe service: frequently gathering data, scheduled triggers, etc.
@@ -390,3 +482,18 @@ class Plugin(PluginBase):
     # 			pass
     # 	time.sleep(60) #sleep 60 seconds between feeds
     ## Check: https://github.com/MikeGawi/ePiframe/blob/master/ePiframe_service.py
+
+    ## the same with scheduler.py helper shipped with this template - tasks of all plugins run on one timer with a small pool
+    ## of workers instead of a sleeping thread per plugin, the thread of the plugin that starts the scheduler first runs it:
+    # def feed_stats(self):
+    # 	if self.backend.is_web_enabled() and self.backend.stats_enabled():
+    # 		self.stats_manager.feed_stats()
+    # def add_service_thread(self, service: Service, backend: BackendManager):
+    # from modules.statsmanager import StatsManager
+    # from plugins.<plugin_name>.scheduler import Scheduler
+    # self.backend = backend
+    # self.stats_manager = StatsManager(backend)
+    # scheduler = Scheduler.get_shared(service, backend, self.logging) #shared by all plugins
+    # scheduler.add_task('<plugin_name>_stats', self.feed_stats, interval=60, jitter=5, refresh=True) #refresh=True runs coalesced backend.refresh() before
+    # scheduler.add_task('<plugin_name>_nightly', self.nightly_job, cron='0 3 * * *', deadline=600) #every day at 3:00, skipped if it can't start till 3:10
+    # scheduler.run() #returns at once if other plugin runs the scheduler
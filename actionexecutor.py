@@ -0,0 +1,178 @@
+import inspect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+# Helper that runs add_action functions (WebUIManager.ActionEntry func) in the background
+# so WebUI doesn't wait for slow devices. Every call returns job ID at once, the job state and
+# result can be checked with JSON API. Repeated clicks of a running or just finished action
+# return the same job instead of starting a new one.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder), in __init__:
+# from plugins.<plugin_name>.actionexecutor import ActionExecutor
+# self.actions = ActionExecutor(self.logging)
+# in add_action: WebUIManager.ActionEntry('Turn Light On', self.actions.wrap('lighton', self.light_on), 'bi bi-lightbulb-fill', 'lighton')
+# and in extend_api: WebUIManager.SiteBind('/api/<plugin_name>_action_status', login_required(self.actions.get_status_func))
+class ActionExecutor:
+
+    STATE_QUEUED = "queued"
+    STATE_RUNNING = "running"
+    STATE_DONE = "done"
+    STATE_FAILED = "failed"
+    STATE_REJECTED = "rejected"
+    ACTIVE_STATES = [STATE_QUEUED, STATE_RUNNING]
+
+    # workers is the number of actions running at once, max_pending limits queued and running jobs,
+    # debounce is time in seconds when finished action result is returned instead of running it again,
+    # keep is the number of finished jobs kept for status checks
+    def __init__(
+        self,
+        logging=None,
+        workers: int = 2,
+        max_pending: int = 16,
+        debounce: float = 2.0,
+        keep: int = 100,
+    ):
+        self.__logging = logging
+        self.__executor = ThreadPoolExecutor(max_workers=workers)
+        self.__max_pending = max_pending
+        self.__debounce = debounce
+        self.__keep = keep
+        self.__lock = threading.Lock()
+        self.__jobs = OrderedDict()  # oldest jobs first
+        self.__last = {}  # last job ID of every action
+
+    # returns function for WebUIManager.ActionEntry that starts the action in the background,
+    # function can accept progress argument - a method to report progress text or percentage
+    def wrap(self, action: str, function: Callable) -> Callable:
+        def start(*args, **kwargs):
+            return self.submit(action, function, *args, **kwargs)
+
+        start.__name__ = getattr(function, "__name__", action)
+        return start
+
+    # starts the action and returns its job ID, the active or just finished job of the same
+    # action is returned without starting a new one
+    def submit(self, action: str, function: Callable, *args, **kwargs) -> str:
+        with self.__lock:
+            job = self.__jobs.get(self.__last.get(action))
+            if job and (
+                job["state"] in self.ACTIVE_STATES
+                or (job["finished"] and time.time() - job["finished"] < self.__debounce)
+            ):
+                return job["id"]  # repeated click
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "action": action,
+                "state": self.STATE_QUEUED,
+                "progress": None,
+                "result": None,
+                "error": None,
+                "submitted": time.time(),
+                "started": None,
+                "finished": None,
+            }
+            pending = sum(
+                1
+                for item in self.__jobs.values()
+                if item["state"] in self.ACTIVE_STATES
+            )
+            if pending >= self.__max_pending:
+                job["state"] = self.STATE_REJECTED
+                job["error"] = "Too many actions running"
+                job["finished"] = job["submitted"]
+            self.__jobs[job["id"]] = job
+            self.__last[action] = job["id"]
+            self.__trim()
+
+        if job["state"] == self.STATE_QUEUED:
+            if "progress" in self.__get_parameters(function):
+                kwargs["progress"] = lambda value: self.__update(
+                    job["id"], progress=value
+                )
+            self.__executor.submit(
+                self.__run, job["id"], action, function, args, kwargs
+            )
+        return job["id"]
+
+    @staticmethod
+    def __get_parameters(function: Callable):
+        try:
+            return inspect.signature(function).parameters
+        except (TypeError, ValueError):
+            return {}
+
+    # action name is passed as the finished job can be trimmed from history at any time
+    def __run(
+        self, job_id: str, action: str, function: Callable, args: tuple, kwargs: dict
+    ):
+        self.__update(job_id, state=self.STATE_RUNNING, started=time.time())
+        try:
+            result = function(*args, **kwargs)
+            self.__update(
+                job_id,
+                state=self.STATE_DONE,
+                result=None if result is None else str(result),
+                finished=time.time(),
+            )
+        except Exception as exception:
+            self.__update(
+                job_id,
+                state=self.STATE_FAILED,
+                error=str(exception) or type(exception).__name__,
+                finished=time.time(),
+            )
+            if self.__logging:
+                self.__logging.log("Action {} failed: {}".format(action, exception))
+
+    def __update(self, job_id: str, **values):
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            if job:
+                job.update(values)
+
+    # removes the oldest finished jobs above the limit
+    def __trim(self):
+        finished = [
+            job_id
+            for job_id, job in self.__jobs.items()
+            if job["state"] not in self.ACTIVE_STATES
+        ]
+        for job_id in finished[: max(len(finished) - self.__keep, 0)]:
+            action = self.__jobs.pop(job_id)["action"]
+            if self.__last.get(action) == job_id:
+                del self.__last[action]
+
+    # returns copy of the job by ID, the last job of the action or None if it's unknown
+    # or expired (trimmed from the kept history)
+    def get_job(
+        self, job_id: Optional[str] = None, action: Optional[str] = None
+    ) -> Optional[Dict]:
+        with self.__lock:
+            job = self.__jobs.get(job_id or self.__last.get(action))
+            return dict(job) if job else None
+
+    # returns copies of the jobs, newest first
+    def get_jobs(self) -> list:
+        with self.__lock:
+            return [dict(job) for job in reversed(self.__jobs.values())]
+
+    # API method returning JSON status: job with ?id=<job ID>, last job of ?action=<action>
+    # or all kept jobs
+    def get_status_func(self):
+        from flask import jsonify, request
+
+        if "id" in request.args or "action" in request.args:
+            job = self.get_job(request.args.get("id"), request.args.get("action"))
+            return (
+                jsonify(job) if job else (jsonify(error="Unknown or expired job"), 404)
+            )
+        return jsonify(jobs=self.get_jobs())
+
+    # stops accepting actions, waits for running ones if wait is True
+    def shutdown(self, wait: bool = True):
+        self.__executor.shutdown(wait=wait)
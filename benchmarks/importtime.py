@@ -0,0 +1,161 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+# Startup cost of plugins: every plugin module is imported in a fresh interpreter (like ePiframe
+# service and WebUI do at start) and compared with the budget.
+# Run from the repository root, e.g.: python benchmarks/importtime.py --budget 150
+# or with real ePiframe modules: python benchmarks/importtime.py --epiframe-path ~/ePiframe
+# Exit code is 1 when any plugin is over the budget, so it can be used in CI.
+
+PLUGINS = {
+    "template": "plugins.template._plugin",
+    "episync": "plugins.ePiSync_code_tutorial._plugin",
+}
+# libraries that should be loaded by the hooks that use them, not at plugin import
+HEAVY_MODULES = ["PIL", "flask", "flask_login", "requests", "numpy", "pandas"]
+MARKER = "plugin import start"
+
+
+# imports the module in this process and prints the result, started by measure
+def child(module: str, epiframe_path: str):
+    if epiframe_path:
+        sys.path.insert(0, epiframe_path)
+    stubs.install(plugins_only=bool(epiframe_path))
+    loaded = set(sys.modules)
+    sys.stderr.write(MARKER + "\n")
+    sys.stderr.flush()
+    start = time.perf_counter()
+    importlib.import_module(module)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(
+        json.dumps(
+            {
+                "ms": elapsed,
+                "heavy": [
+                    name
+                    for name in HEAVY_MODULES
+                    if name in sys.modules and name not in loaded
+                ],
+            }
+        )
+    )
+
+
+# returns (cumulative ms, module) of the imports done directly by the plugin module
+def parse_importtime(output: str) -> List[tuple]:
+    lines = output.split(MARKER + "\n", 1)[-1].splitlines()
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)
+
+
+def measure(module: str, repeat: int, epiframe_path: str) -> Dict:
+    times = []
+    result = {}
+    imports = []
+    for _ in range(repeat):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                os.path.abspath(__file__),
+                "--child",
+                module,
+                "--epiframe-path",
+                epiframe_path or str(),
+            ],
+            capture_output=True,
+            text=True,
+            cwd=stubs.ROOT_PATH,
+        )
+        if process.returncode:
+            raise RuntimeError(
+                "{} import failed:\n{}".format(module, process.stderr[-2000:])
+            )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        times.append(result["ms"])
+        imports = parse_importtime(process.stderr)
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+        "heavy": result["heavy"],
+        "imports": [(name, round(value, 3)) for value, name in imports],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plugins import time with budget")
+    parser.add_argument(
+        "--plugins", default=",".join(PLUGINS), help="plugins to measure"
+    )
+    parser.add_argument(
+        "--budget", type=float, default=150, help="import time budget in ms"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="fresh interpreters per plugin"
+    )
+    parser.add_argument("--top", type=int, default=5, help="slowest imports shown")
+    parser.add_argument(
+        "--epiframe-path",
+        default=None,
+        help="ePiframe folder to use real modules instead of stubs",
+    )
+    parser.add_argument("--output", default=None, help="JSON file to store results")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        child(arguments.child, arguments.epiframe_path)
+        return
+
+    results = {}
+    over_budget = False
+    for plugin in arguments.plugins.split(","):
+        results[plugin] = measure(
+            PLUGINS[plugin], max(arguments.repeat, 1), arguments.epiframe_path
+        )
+        over = results[plugin]["median_ms"] > arguments.budget
+        over_budget |= over
+        print(
+            "{:<10} {:>9.1f} ms (max {:.1f}, budget {:.0f}) {}".format(
+                plugin,
+                results[plugin]["median_ms"],
+                results[plugin]["max_ms"],
+                arguments.budget,
+                "OVER BUDGET" if over else "ok",
+            )
+        )
+        if results[plugin]["heavy"]:
+            print("  heavy modules: {}".format(", ".join(results[plugin]["heavy"])))
+        for name, value in results[plugin]["imports"][: arguments.top]:
+            print("  {:>9.1f} ms  {}".format(value, name))
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(
+                {"budget_ms": arguments.budget, "results": results}, file, indent=2
+            )
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
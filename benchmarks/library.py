@@ -0,0 +1,50 @@
+import os
+import random
+from typing import List
+from PIL import Image, ImageDraw
+
+# Synthetic photo library generator: mixed formats and orientations, deterministic for the same seed.
+
+FORMATS = [("jpg", "JPEG"), ("png", "PNG"), ("gif", "GIF")]
+WEIGHTS = [8, 1, 1]  # mostly JPEG like real libraries
+
+
+# creates count photos in path (existing ones are reused) and returns their paths
+def create_library(
+    path: str, count: int, width: int = 320, height: int = 240, seed: int = 1
+) -> List[str]:
+    os.makedirs(path, exist_ok=True)
+    generator = random.Random(seed)
+    files = []
+    for number in range(count):
+        extension, image_format = generator.choices(FORMATS, WEIGHTS)[0]
+        portrait = generator.random() < 0.3
+        size = (height, width) if portrait else (width, height)
+        color = tuple(generator.randrange(256) for _ in range(3))
+        filename = os.path.join(path, "photo_{:06d}.{}".format(number, extension))
+        files.append(filename)
+        if os.path.exists(filename):
+            continue
+        image = Image.new("RGB", size, color)
+        draw = ImageDraw.Draw(image)
+        for _ in range(4):
+            box = sorted(generator.randrange(size[0]) for _ in range(2)), sorted(
+                generator.randrange(size[1]) for _ in range(2)
+            )
+            draw.rectangle(
+                (box[0][0], box[1][0], box[0][1], box[1][1]),
+                fill=tuple(generator.randrange(256) for _ in range(3)),
+            )
+        image.save(filename, image_format)
+        timestamp = 1500000000 + number * 3600
+        os.utime(filename, (timestamp, timestamp))  # different creation dates
+    return files
+
+
+# creates frame sized photo in the given mode for postprocessing
+def create_frame_photo(path: str, width: int, height: int, mode: str = "RGB") -> str:
+    image = Image.effect_noise((width, height), 64).convert(mode)
+    image_format = "PNG" if mode in ["1", "P", "L"] else "BMP"
+    path = "{}.{}".format(os.path.splitext(path)[0], image_format.lower())
+    image.save(path, image_format)
+    return path  # extension matches the format
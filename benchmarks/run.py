@@ -0,0 +1,483 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+import pandas as pd  # noqa: E402
+from library import create_frame_photo, create_library  # noqa: E402
+
+# Offline benchmark of plugin hooks with synthetic photo libraries.
+# Run from the repository root, e.g.: python benchmarks/run.py --sizes 100,1000 --output results.json
+# and compare with the previous results: python benchmarks/run.py --compare results.json
+
+ID_LABEL = "id"
+CREATION_LABEL = "creation_time"
+SOURCE_LABEL = "source"
+FRAME_WIDTH = 800
+FRAME_HEIGHT = 480
+CHAIN_PLUGINS = 4  # plugins postprocessing the same photo
+
+
+# runs function repeat times and returns times in milliseconds, setup is not measured
+def measure(function: Callable, repeat: int, setup: Callable = None) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: List[float], items: int = 1) -> Dict:
+    ordered = sorted(samples)
+
+    def percentile(value: float) -> float:
+        return round(ordered[min(int(len(ordered) * value), len(ordered) - 1)], 3)
+
+    mean = sum(ordered) / len(ordered)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(mean, 3),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "items_per_s": round(items * 1000 / mean, 1) if mean else None,
+    }
+
+
+# reference implementations of the commented template _plugin.py examples
+class TemplateExamples:
+    SOURCE = "'Plugin Name' plugin source"
+
+    def __init__(self, library_path: str):
+        self.__library_path = library_path
+
+    # add_photo_source example 2 - lists zipped to DataFrame
+    def add_photo_source_lists(self):
+        files = stubs.LocalSourceManager(
+            self.__library_path, False, stubs.Constants.EXTENSIONS
+        ).get_files()
+        dates = [
+            time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(os.path.getmtime(file)))
+            for file in files
+        ]
+        photos = pd.DataFrame(
+            list(zip(files, dates)), columns=[ID_LABEL, CREATION_LABEL]
+        )
+        photos[SOURCE_LABEL] = self.SOURCE
+        return photos
+
+    # add_photo_source example 3 - sourcebuilder.py helper
+    def add_photo_source_builder(self):
+        from plugins.template.sourcebuilder import SourceBuilder
+
+        return SourceBuilder(
+            ID_LABEL, CREATION_LABEL, SOURCE_LABEL, self.SOURCE
+        ).from_directory(self.__library_path, stubs.Constants.EXTENSIONS)
+
+    # change_photos_list example - sorting by creation time
+    @staticmethod
+    def change_photos_list(photo_list):
+        return photo_list.sort_values(by=CREATION_LABEL, ascending=False)
+
+    # postprocess_photo example - text on rotated photo
+    @staticmethod
+    def postprocess_photo(final_photo: str):
+        from PIL import Image, ImageColor, ImageDraw
+
+        image = Image.open(final_photo)
+        image = image.transpose(Image.ROTATE_90)
+        draw = ImageDraw.Draw(image)
+        stroke = ImageColor.getcolor("Black", image.mode)
+        fill = ImageColor.getcolor("White", image.mode)
+        draw.text((1, 100), "text", stroke_width=2, stroke_fill=stroke, fill=fill)
+        image = image.transpose(Image.ROTATE_270)
+        image.save(final_photo)
+
+    # the same example as image variant for imagechain.py helper
+    @staticmethod
+    def postprocess_image(image):
+        from PIL import Image, ImageColor, ImageDraw
+
+        image = image.transpose(Image.ROTATE_90)
+        draw = ImageDraw.Draw(image)
+        stroke = ImageColor.getcolor("Black", image.mode)
+        fill = ImageColor.getcolor("White", image.mode)
+        draw.text((1, 100), "text", stroke_width=2, stroke_fill=stroke, fill=fill)
+        return image.transpose(Image.ROTATE_270)
+
+
+def benchmark_template(library_path: str, work_path: str, repeat: int, mode: str):
+    from plugins.template.imagechain import ImageChain
+
+    examples = TemplateExamples(library_path)
+    photos = examples.add_photo_source_lists()
+    count = len(photos)
+    frame = create_frame_photo(
+        os.path.join(work_path, "frame_source.png"), FRAME_HEIGHT, FRAME_WIDTH, mode
+    )
+    final_photo = os.path.join(work_path, "frame" + os.path.splitext(frame)[1])
+    return {
+        "add_photo_source": summarize(
+            measure(examples.add_photo_source_lists, repeat), count
+        ),
+        "add_photo_source_builder": summarize(
+            measure(examples.add_photo_source_builder, repeat), count
+        ),
+        "change_photos_list": summarize(
+            measure(lambda: examples.change_photos_list(photos), repeat), count
+        ),
+        "postprocess_photo": summarize(
+            measure(
+                examples.postprocess_photo,
+                repeat,
+                lambda: shutil.copyfile(frame, final_photo) and final_photo,
+            )
+        ),
+        # the same hook of several plugins - every plugin decodes and saves the photo
+        # or the image chain does it once for all of them
+        "postprocess_photo_x{}".format(CHAIN_PLUGINS): summarize(
+            measure(
+                lambda path: [
+                    examples.postprocess_photo(path) for _ in range(CHAIN_PLUGINS)
+                ],
+                repeat,
+                lambda: shutil.copyfile(frame, final_photo),
+            )
+        ),
+        "postprocess_image_x{}".format(CHAIN_PLUGINS): summarize(
+            measure(
+                lambda path: ImageChain.run_hook(
+                    [examples] * CHAIN_PLUGINS,
+                    path,
+                    "postprocess_image",
+                    "postprocess_photo",
+                ),
+                repeat,
+                lambda: shutil.copyfile(frame, final_photo),
+            )
+        ),
+    }
+
+
+# compares the template photo list transforms helper with the usual DataFrame operations
+def benchmark_transforms(count: int, repeat: int):
+    from plugins.template.listtransforms import ListTransforms
+
+    generator = random.Random(1)
+    sources = [TemplateExamples.SOURCE, "Google Photos", "Local"]
+    photo_list = pd.DataFrame(
+        {
+            ID_LABEL: [
+                "/photos/photo_{:07d}.jpg".format(number) for number in range(count)
+            ],
+            CREATION_LABEL: [
+                time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ",
+                    time.gmtime(generator.randrange(1_000_000_000, 1_700_000_000)),
+                )
+                for _ in range(count)
+            ],
+            SOURCE_LABEL: [generator.choice(sources) for _ in range(count)],
+        }
+    )
+    categorical_list = photo_list.copy()
+    ListTransforms.set_categorical(categorical_list, SOURCE_LABEL)
+
+    def filter_iterrows():
+        rows = photo_list[photo_list[SOURCE_LABEL] == TemplateExamples.SOURCE]
+        return [row[ID_LABEL] for index, row in rows.iterrows()]
+
+    def filter_iterate(photos: pd.DataFrame):
+        mask = ListTransforms.get_mask(photos, SOURCE_LABEL, TemplateExamples.SOURCE)
+        return [
+            photo_id
+            for photo_id, created in ListTransforms.iterate(
+                photos, [ID_LABEL, CREATION_LABEL], mask
+            )
+        ]
+
+    def sort_reorder():
+        return ListTransforms.reorder(
+            photo_list,
+            ListTransforms.get_order(photo_list, CREATION_LABEL, descending=True),
+        )
+
+    return {
+        "filter_iterrows": summarize(measure(filter_iterrows, repeat), count),
+        "filter_itertuples": summarize(
+            measure(
+                lambda: [
+                    row[0]
+                    for row in photo_list[
+                        photo_list[SOURCE_LABEL] == TemplateExamples.SOURCE
+                    ].itertuples(index=False)
+                ],
+                repeat,
+            ),
+            count,
+        ),
+        "filter_mask_iterate": summarize(
+            measure(lambda: filter_iterate(photo_list), repeat), count
+        ),
+        "filter_categorical_iterate": summarize(
+            measure(lambda: filter_iterate(categorical_list), repeat), count
+        ),
+        "sort_values_reset_index": summarize(
+            measure(
+                lambda: photo_list.sort_values(
+                    by=CREATION_LABEL, ascending=False
+                ).reset_index(drop=True),
+                repeat,
+            ),
+            count,
+        ),
+        "sort_order_reorder": summarize(measure(sort_reorder, repeat), count),
+    }
+
+
+def create_episync(library_path: str, work_path: str):
+    plugin_path = os.path.join(work_path, "episync")
+    source_path = stubs.PLUGINS["ePiSync_code_tutorial"]
+    shutil.rmtree(plugin_path, ignore_errors=True)
+    os.makedirs(plugin_path)
+    for name in ["config.cfg", "default", "static"]:
+        copy = (
+            shutil.copytree
+            if os.path.isdir(os.path.join(source_path, name))
+            else shutil.copy
+        )
+        copy(os.path.join(source_path, name), os.path.join(plugin_path, name))
+    remote_path = os.path.join(work_path, "remote")
+    os.makedirs(remote_path, exist_ok=True)  # empty remote, sync does nothing
+
+    stubs.ConfigBase.OVERRIDES = {
+        "is_enabled": 1,
+        "local_path": library_path,
+        "remote_path": remote_path,
+        "remote_host": "",
+        "sync_interval": 30,
+        "thumb_engine": "pillow",
+    }
+    module = importlib.import_module("plugins.ePiSync_code_tutorial._plugin")
+    global_config = stubs.GlobalConfig(
+        {
+            "convert_bin_path": "convert",
+            "rotation": 90,
+            "image_width": FRAME_WIDTH,
+            "image_height": FRAME_HEIGHT,
+        }
+    )
+    return module.Plugin(plugin_path, None, stubs.Logs(), global_config)
+
+
+def benchmark_episync(library_path: str, work_path: str, repeat: int, mode: str):
+    from flask import Flask
+
+    plugin = create_episync(library_path, work_path)
+    results = {}
+    start = time.perf_counter()
+    photos = plugin.add_photo_source(ID_LABEL, CREATION_LABEL, SOURCE_LABEL, None)
+    results["add_photo_source_cold"] = summarize(
+        [(time.perf_counter() - start) * 1000], len(photos)
+    )
+    results["add_photo_source"] = summarize(
+        measure(
+            lambda: plugin.add_photo_source(
+                ID_LABEL, CREATION_LABEL, SOURCE_LABEL, None
+            ),
+            repeat,
+        ),
+        len(photos),
+    )
+
+    def change_photos_list():
+        plugin.change_photos_list(
+            ID_LABEL, CREATION_LABEL, SOURCE_LABEL, photos, None, None, None
+        )
+
+    results["change_photos_list_cold"] = summarize(
+        measure(change_photos_list, 1), len(photos)
+    )  # all thumbnails are generated here
+    results["change_photos_list"] = summarize(
+        measure(change_photos_list, repeat), len(photos)
+    )
+
+    frame = create_frame_photo(
+        os.path.join(work_path, "frame_source.png"), FRAME_HEIGHT, FRAME_WIDTH, mode
+    )
+    final_photo = os.path.join(work_path, "frame" + os.path.splitext(frame)[1])
+    photo = photos.iloc[0].copy()
+    results["postprocess_photo"] = summarize(
+        measure(
+            lambda path: plugin.postprocess_photo(
+                path,
+                FRAME_WIDTH,
+                FRAME_HEIGHT,
+                False,
+                None,
+                photo,
+                ID_LABEL,
+                CREATION_LABEL,
+                SOURCE_LABEL,
+            ),
+            repeat,
+            lambda: shutil.copyfile(frame, final_photo),
+        )
+    )
+
+    application = Flask(__name__)
+    generator = random.Random(1)
+
+    def get_sync_image(size: str):
+        query = "file={}{}".format(
+            generator.randrange(len(photos)), "&size=" + size if size else ""
+        )
+        with application.test_request_context("/api/get_sync_image?" + query):
+            response = plugin.get_sync_image()
+            response.direct_passthrough = False
+            response.get_data()
+            response.close()
+
+    for size in ["thumb", "medium", "frame"]:
+        results["get_sync_image_" + size] = summarize(
+            measure(lambda: get_sync_image(size), repeat)
+        )
+    results["get_sync_image"] = summarize(measure(lambda: get_sync_image(""), repeat))
+    return results
+
+
+def get_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=stubs.ROOT_PATH,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout.strip()
+    except OSError:
+        return str()
+
+
+def print_results(results: Dict, previous: Dict = None):
+    for size, plugins in results.items():
+        for plugin, hooks in plugins.items():
+            print("\n{} - {} photos".format(plugin, size))
+            for hook, summary in hooks.items():
+                line = "  {:<26} p50 {:>10.3f} ms  p90 {:>10.3f} ms  p99 {:>10.3f} ms  {:>12} items/s".format(
+                    hook,
+                    summary["p50_ms"],
+                    summary["p90_ms"],
+                    summary["p99_ms"],
+                    summary["items_per_s"],
+                )
+                try:
+                    before = previous[size][plugin][hook]["p50_ms"]
+                    line += "  {:+.1f}%".format(
+                        (summary["p50_ms"] - before) * 100 / before
+                    )
+                except (KeyError, TypeError, ZeroDivisionError):
+                    pass
+                print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of plugin hooks")
+    parser.add_argument(
+        "--sizes", default="100,1000", help="library sizes, comma separated"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="measured runs per hook")
+    parser.add_argument(
+        "--plugins",
+        default="template,episync,transforms",
+        help="plugins to measure, transforms is the photo list helper",
+    )
+    parser.add_argument(
+        "--list-multiplier",
+        type=int,
+        default=10,
+        help="photo list size for transforms is library size times this",
+    )
+    parser.add_argument(
+        "--mode", default="RGB", help="frame photo mode, e.g. RGB, L, 1, P"
+    )
+    parser.add_argument(
+        "--image-width", type=int, default=320, help="library photo width"
+    )
+    parser.add_argument(
+        "--image-height", type=int, default=240, help="library photo height"
+    )
+    parser.add_argument(
+        "--work-path", default=None, help="libraries location, reused between runs"
+    )
+    parser.add_argument("--output", default=None, help="JSON file to store results")
+    parser.add_argument(
+        "--compare", default=None, help="JSON file with previous results"
+    )
+    arguments = parser.parse_args()
+
+    work_path = arguments.work_path or os.path.join(
+        tempfile.gettempdir(), "epiframe_plugin_benchmarks"
+    )
+    benchmarks = {"template": benchmark_template, "episync": benchmark_episync}
+    results = {}
+    for size in [int(size) for size in arguments.sizes.split(",")]:
+        library_path = os.path.join(
+            work_path,
+            "library_{}x{}_{}".format(
+                arguments.image_width, arguments.image_height, size
+            ),
+        )
+        create_library(
+            library_path, size, arguments.image_width, arguments.image_height
+        )
+        results[str(size)] = {
+            plugin: (
+                benchmark_transforms(size * arguments.list_multiplier, arguments.repeat)
+                if plugin == "transforms"
+                else benchmarks[plugin](
+                    library_path, work_path, arguments.repeat, arguments.mode
+                )
+            )
+            for plugin in arguments.plugins.split(",")
+        }
+
+    previous = None
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            previous = json.load(file).get("results")
+    print_results(results, previous)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(
+                {
+                    "revision": get_revision(),
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "parameters": vars(arguments),
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import configparser
+import os
+import sys
+import types
+from typing import Dict
+
+# Minimal stand-ins of ePiframe modules so plugins can be imported and measured without ePiframe installed.
+# Only the parts used by the template and the tutorial plugin are here.
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS = {
+    "template": ROOT_PATH,
+    "ePiSync_code_tutorial": os.path.join(ROOT_PATH, "docs", "ePiSync_code_tutorial"),
+}
+
+
+class Constants:
+    EXTENSIONS = ["jpg", "jpeg", "png", "gif", "bmp", "heic", "webp"]
+    EXTENSION_TO_TYPE = {
+        "jpg": "image/jpeg",
+        "jpeg": "image/jpeg",
+        "png": "image/png",
+        "gif": "image/gif",
+        "bmp": "image/bmp",
+        "heic": "image/heic",
+        "webp": "image/webp",
+    }
+    TYPE_TO_EXTENSION = {
+        "image/jpeg": "jpg",
+        "image/png": "png",
+        "image/gif": "gif",
+        "image/bmp": "bmp",
+        "image/heic": "heic",
+        "image/webp": "webp",
+    }
+    MIME_START = "image/"
+    FIRST_FRAME_GIF = "[0]"
+    OK_STATUS_ERRORCODE = 200
+    CHECK_CONNECTION_TIMEOUT = 5
+
+
+class ConfigProperty:
+    STRING_TYPE = "str"
+    FILE_TYPE = "file"
+    INTEGER_TYPE = "int"
+    BOOLEAN_TYPE = "bool"
+    FLOAT_TYPE = "float"
+    INTLIST_TYPE = "intlist"
+    STRINGLIST_TYPE = "stringlist"
+
+    def __init__(self, name: str, config, prop_type: str = STRING_TYPE, **kwargs):
+        self.__name = name
+        self.__config = config
+        self.__type = prop_type
+        self.__kwargs = kwargs
+        convert = kwargs.get("convert")
+        if convert and config.get(name):
+            convert(config.get(name))
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_type(self) -> str:
+        return self.__type
+
+    # only range and possible values checks, enough for the plugins here
+    def validate(self):
+        dependency = self.__kwargs.get("dependency")
+        if isinstance(dependency, str) and not self.__config.getint(dependency):
+            return
+        value = self.__config.get(self.__name)
+        if self.__type == self.INTEGER_TYPE:
+            number = int(value)
+            minimum = self.__kwargs.get("minvalue")
+            maximum = self.__kwargs.get("maxvalue")
+            if minimum is not None and number < minimum:
+                raise Exception("{} is less than {}".format(self.__name, minimum))
+            if maximum is not None and number > maximum:
+                raise Exception("{} is greater than {}".format(self.__name, maximum))
+        possible = self.__kwargs.get("possible")
+        if possible and value not in possible:
+            raise Exception("{} should be one of {}".format(self.__name, possible))
+
+
+class ConfigBase:
+    # values that replace the ones from config file, set before plugin is created
+    OVERRIDES = {}
+
+    def __init__(self, path: str, default_path: str = None, main_class=None):
+        self.main_class = main_class
+        self.__path = path
+        self.__default_path = default_path
+        self.read_config()
+
+    def read_config(self):
+        self.__values = {}
+        parser = configparser.ConfigParser()
+        parser.read([self.__default_path or self.__path, self.__path])
+        for section in parser.sections():
+            self.__values.update(parser.items(section))
+        self.__values.update(
+            {name: str(value) for name, value in self.OVERRIDES.items()}
+        )
+        self.SETTINGS = []
+        self.load_settings()
+
+    def load_settings(self):
+        pass
+
+    def verify_exceptions(self):
+        for setting in self.SETTINGS:
+            setting.validate()
+
+    def get(self, name: str) -> str:
+        return self.__values.get(name, str())
+
+    def getint(self, name: str) -> int:
+        return int(self.get(name) or 0)
+
+    def set(self, name: str, value):
+        self.__values[name] = str(value)
+
+
+class GlobalConfig(ConfigBase):
+    def __init__(self, values: Dict):
+        self.OVERRIDES = values
+        super().__init__(os.devnull)
+
+
+class PluginBase:
+    SOURCE = str()
+
+    class PluginConfigManager(ConfigBase):
+        pass
+
+    def __init__(self, path: str, pid_manager, logging, global_config: ConfigBase):
+        self.path = path
+        self.pid_manager = pid_manager
+        self.logging = logging
+        self.global_config = global_config
+        self.config = self.PluginConfigManager(
+            os.path.join(path, "config.cfg"),
+            os.path.join(path, "default", "config.default"),
+            self,
+        )
+
+    # hooks are always defined, plugins override the ones they implement
+    def preprocess_photo(self, original_photo: str, *arguments):
+        pass
+
+    def postprocess_photo(self, final_photo: str, *arguments):
+        pass
+
+
+class Logs:
+    def __init__(self, quiet: bool = True):
+        self.__quiet = quiet
+
+    def log(self, text):
+        if not self.__quiet:
+            print(text)
+
+
+class LocalSourceManager:
+    def __init__(self, path: str, recursive: bool, extensions):
+        self.__path = path
+        self.__extensions = tuple("." + extension for extension in extensions)
+
+    @staticmethod
+    def create_directory(path: str):
+        os.makedirs(path, exist_ok=True)
+
+    def get_files(self):
+        return sorted(
+            os.path.join(self.__path, name)
+            for name in os.listdir(self.__path)
+            if name.lower().endswith(self.__extensions)
+        )
+
+
+class ConvertManager:
+    def get_image_format(self, convert_bin_path: str, filename: str, first_frame):
+        from PIL import Image
+
+        try:
+            with Image.open(filename) as image:
+                return None, image.format
+        except Exception as exception:
+            return str(exception), None
+
+
+class WebUIManager:
+    class SiteBind:
+        def __init__(self, url, func, methods=None, defaults=None):
+            self.url = url
+            self.func = func
+            self.methods = methods or ["GET"]
+            self.defaults = defaults
+
+    class MenuEntry:
+        def __init__(self, name, url, id, icon):
+            self.name = name
+            self.url = url
+            self.id = id
+            self.icon = icon
+
+    class ActionEntry:
+        def __init__(self, name, func, icon, action):
+            self.name = name
+            self.func = func
+            self.icon = icon
+            self.action = action
+
+    def add_menu_entries(self, entries):
+        pass
+
+
+class Empty:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def login_required(function):
+    return function  # no users in benchmarks
+
+
+# registers stubs as ePiframe modules and plugins folder as plugins package,
+# with plugins_only real ePiframe modules (in sys.path) are used
+def install(plugins_only: bool = False):
+    modules = {
+        "modules": {},
+        "modules.base": {},
+        "modules.base.pluginbase": {"PluginBase": PluginBase},
+        "modules.base.configbase": {"ConfigBase": ConfigBase},
+        "modules.backendmanager": {"BackendManager": Empty},
+        "modules.convertmanager": {"ConvertManager": ConvertManager},
+        "modules.filteringmanager": {"FilteringManager": Empty},
+        "modules.indexmanager": {"IndexManager": Empty},
+        "modules.localsourcemanager": {"LocalSourceManager": LocalSourceManager},
+        "modules.photomanager": {"PhotoManager": Empty},
+        "modules.pidmanager": {"PIDManager": Empty},
+        "modules.usersmanager": {"UsersManager": Empty},
+        "modules.webuimanager": {"WebUIManager": WebUIManager},
+        "misc": {},
+        "misc.configproperty": {"ConfigProperty": ConfigProperty},
+        "misc.connection": {"Connection": Empty},
+        "misc.constants": {"Constants": Constants},
+        "misc.logs": {"Logs": Logs},
+        "ePiframe_service": {"Service": Empty},
+        "flask_login": {"login_required": login_required},
+        "plugins": {"__path__": []},
+    }
+    for name, attributes in modules.items():
+        if plugins_only and name != "plugins":
+            continue
+        if name in sys.modules and name not in ["flask_login", "plugins"]:
+            continue
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        if "." not in name or name.startswith("modules.base"):
+            module.__path__ = []
+        sys.modules[name] = module
+
+    for name, path in PLUGINS.items():
+        package = types.ModuleType("plugins." + name)
+        package.__path__ = [path]
+        sys.modules["plugins." + name] = package
@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.template.downloadmanager import DownloadManager  # noqa: E402
+
+# Checks of DownloadManager against local HTTP server: downloads, missing files,
+# checksum verification and LRU eviction.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # no request logs in test output
+
+
+class Logs:
+    def __init__(self):
+        self.lines = []
+
+    def log(self, text):
+        self.lines.append(text)
+
+
+class DownloadManagerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.served_path = tempfile.mkdtemp()
+        handler = functools.partial(QuietHandler, directory=cls.served_path)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.url = "http://127.0.0.1:{}/".format(cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.served_path)
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        shutil.rmtree(self.cache_path)
+        for name in os.listdir(self.served_path):
+            os.remove(os.path.join(self.served_path, name))
+
+    def __get_manager(
+        self, max_size: int = 1024 * 1024, logging=None
+    ) -> DownloadManager:
+        manager = DownloadManager(
+            self.cache_path, max_size, workers=2, timeout=5, logging=logging
+        )
+        self.managers.append(manager)
+        return manager
+
+    def __serve(self, name: str, content: bytes) -> str:
+        with open(os.path.join(self.served_path, name), "wb") as file:
+            file.write(content)
+        return self.url + name
+
+    def __get_cached_files(self) -> list:
+        return sorted(
+            name
+            for name in os.listdir(self.cache_path)
+            if name != "index.json" and not name.endswith(".tmp")
+        )
+
+    def test_download_and_cache(self):
+        manager = self.__get_manager()
+        url = self.__serve("photo.jpg", b"photo")
+        path = manager.get("photo", url)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), b"photo")
+
+        os.remove(os.path.join(self.served_path, "photo.jpg"))
+        self.assertEqual(manager.get("photo", url), path)  # no request, cached
+
+    def test_prefetch(self):
+        manager = self.__get_manager()
+        items = [
+            (str(number), self.__serve("{}.jpg".format(number), bytes([number]) * 10))
+            for number in range(5)
+        ]
+        manager.prefetch(items)
+        for key, url in items:
+            with open(manager.get(key, url), "rb") as file:
+                self.assertEqual(file.read(), bytes([int(key)]) * 10)
+
+    def test_prefetch_error_is_logged(self):
+        logs = Logs()
+        manager = self.__get_manager(logging=logs)
+        manager.prefetch([("missing", self.url + "missing.jpg")])
+        manager.close()  # waits for the download
+        self.assertEqual(len(logs.lines), 1)
+        self.assertRegex(logs.lines[0], "^Prefetch error - .*status 404")
+
+    def test_missing_file(self):
+        manager = self.__get_manager()
+        with self.assertRaisesRegex(Exception, "status 404"):
+            manager.get("missing", self.url + "missing.jpg")
+        self.assertEqual(self.__get_cached_files(), [])
+
+        url = self.__serve("missing.jpg", b"found")  # failed download is retried
+        with open(manager.get("missing", url), "rb") as file:
+            self.assertEqual(file.read(), b"found")
+
+    def test_checksum(self):
+        manager = self.__get_manager()
+        url = self.__serve("photo.jpg", b"photo")
+        with self.assertRaisesRegex(Exception, "does not match"):
+            manager.get("photo", url, hashlib.sha256(b"other").hexdigest())
+        self.assertEqual(self.__get_cached_files(), [])
+
+        checksum = hashlib.sha256(b"photo").hexdigest()
+        path = manager.get("photo", url, checksum.upper())
+        self.assertEqual(manager.get("photo", url, checksum), path)
+
+    def test_changed_checksum_downloads_again(self):
+        manager = self.__get_manager()
+        url = self.__serve("photo.jpg", b"old")
+        manager.get("photo", url)
+        self.__serve("photo.jpg", b"new")
+        path = manager.get("photo", url, hashlib.sha256(b"new").hexdigest())
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), b"new")
+
+    def test_eviction(self):
+        manager = self.__get_manager(max_size=250)
+        urls = {key: self.__serve(key, key.encode() * 100) for key in "abc"}
+        paths = {key: manager.get(key, url) for key, url in urls.items() if key != "c"}
+        manager.get("a", urls["a"])  # a is used recently, b is the oldest
+        paths["c"] = manager.get("c", urls["c"])
+
+        self.assertTrue(os.path.exists(paths["a"]))
+        self.assertFalse(os.path.exists(paths["b"]))
+        self.assertTrue(os.path.exists(paths["c"]))
+        self.assertEqual(len(self.__get_cached_files()), 2)
+
+    def test_index_is_kept(self):
+        manager = self.__get_manager()
+        url = self.__serve("photo.jpg", b"photo")
+        path = manager.get("photo", url)
+        manager.close()
+        self.managers.remove(manager)
+
+        os.remove(os.path.join(self.served_path, "photo.jpg"))
+        self.assertEqual(self.__get_manager().get("photo", url), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+# Checks of ePiSync plugin creation: helpers with databases are created on the first use,
+# so a disabled plugin leaves its path untouched.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+SOURCE_PATH = stubs.PLUGINS["ePiSync_code_tutorial"]
+
+
+class EPiSyncPluginTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.plugin_path = os.path.join(self.directory, "episync")
+        self.local_path = os.path.join(self.directory, "photos")
+        os.makedirs(os.path.join(self.plugin_path, "default"))
+        os.mkdir(self.local_path)
+        for name in ["config.cfg", os.path.join("default", "config.default")]:
+            shutil.copy(
+                os.path.join(SOURCE_PATH, name), os.path.join(self.plugin_path, name)
+            )
+        self.overrides = stubs.ConfigBase.OVERRIDES
+        stubs.ConfigBase.OVERRIDES = {"is_enabled": 0, "local_path": self.local_path}
+
+    def tearDown(self):
+        stubs.ConfigBase.OVERRIDES = self.overrides
+        shutil.rmtree(self.directory)
+
+    def __create(self):
+        module = importlib.import_module("plugins.ePiSync_code_tutorial._plugin")
+        global_config = stubs.GlobalConfig(
+            {
+                "convert_bin_path": "convert",
+                "rotation": 0,
+                "image_width": 800,
+                "image_height": 480,
+            }
+        )
+        return module.Plugin(self.plugin_path, None, stubs.Logs(), global_config)
+
+    def test_disabled_plugin_creates_no_files(self):
+        self.__create()
+        self.assertEqual(
+            sorted(os.listdir(self.plugin_path)), ["config.cfg", "default"]
+        )
+
+    def test_helpers_are_created_on_first_use(self):
+        plugin = self.__create()
+        with open(os.path.join(self.local_path, "a.jpg"), "wb") as file:
+            file.write(b"photo")
+        self.assertEqual(plugin.get_files(), [os.path.join(self.local_path, "a.jpg")])
+        self.assertIn("manifest.db", os.listdir(self.plugin_path))
+        self.assertNotIn("formats.db", os.listdir(self.plugin_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from PIL import Image  # noqa: E402
+
+from modules.base.pluginbase import PluginBase  # noqa: E402
+from plugins.template.imagechain import ImageChain  # noqa: E402
+
+# Checks of ImageChain hook dispatch: image variant, path variant and plugins
+# that only inherit the hooks from PluginBase.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+
+class Plugin(PluginBase):
+    def __init__(self):
+        self.calls = []
+
+
+class ImagePlugin(Plugin):
+    def postprocess_image(self, image, color):
+        self.calls.append("image")
+        image.paste(color, (0, 0, 1, 1))
+
+
+class PathPlugin(Plugin):
+    def postprocess_photo(self, final_photo, color):
+        self.calls.append("path")
+        with Image.open(final_photo) as image:
+            image.load()
+        image.paste(color, (1, 0, 2, 1))
+        image.save(final_photo)
+
+
+class ImageChainTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "photo.png")
+        Image.new("RGB", (2, 1)).save(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __run(self, plugins):
+        return ImageChain.run_hook(
+            plugins, self.path, "postprocess_image", "postprocess_photo", (255, 0, 0)
+        )
+
+    def test_image_hook(self):
+        plugin = ImagePlugin()
+        chain = self.__run([plugin, plugin])
+        self.assertEqual(plugin.calls, ["image", "image"])
+        self.assertEqual((chain.decodes, chain.encodes), (1, 1))
+        with Image.open(self.path) as image:
+            self.assertEqual(image.getpixel((0, 0)), (255, 0, 0))
+
+    def test_path_hook(self):
+        image_plugin, path_plugin = ImagePlugin(), PathPlugin()
+        self.__run([image_plugin, path_plugin])
+        self.assertEqual((image_plugin.calls, path_plugin.calls), (["image"], ["path"]))
+        with Image.open(self.path) as image:
+            self.assertEqual(image.getpixel((0, 0)), (255, 0, 0))
+            self.assertEqual(image.getpixel((1, 0)), (255, 0, 0))
+
+    def test_inherited_hook_is_skipped(self):
+        plugin = ImagePlugin()
+        chain = self.__run([plugin, Plugin(), plugin])  # no save and decode between
+        self.assertEqual((chain.decodes, chain.encodes), (1, 1))
+
+        mtime = os.stat(self.path).st_mtime_ns
+        chain = self.__run([Plugin()])
+        self.assertEqual((chain.decodes, chain.encodes), (0, 0))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
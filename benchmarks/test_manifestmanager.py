@@ -0,0 +1,138 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.ePiSync_code_tutorial.manifestmanager import (  # noqa: E402
+    ManifestManager,
+)
+
+# Checks of ePiSync ManifestManager on temporary directory: full scans, rescans only
+# after the directory changed, applying sync changes and keeping the scanned state.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+EXTENSION_TO_TYPE = {"jpg": "image/jpeg", "png": "image/png"}
+
+
+class ManifestManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.local_path = os.path.join(self.directory, "photos")
+        os.mkdir(self.local_path)
+        self.manifest = ManifestManager(
+            os.path.join(self.directory, "manifest.db"), EXTENSION_TO_TYPE
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __write(self, name: str, content: bytes = b"photo") -> str:
+        path = os.path.join(self.local_path, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+    def __age(self):
+        # changes older than the racy window, so the scan stores the directory time
+        past = time.time() - 60
+        os.utime(self.local_path, (past, past))
+
+    def test_update(self):
+        first, second = self.__write("a.jpg"), self.__write("b.png")
+        self.__write("notes.txt")
+        os.mkdir(os.path.join(self.local_path, "sub.jpg"))
+        changes = self.manifest.update(self.local_path)
+        self.assertEqual(sorted(changes.added), [first, second])
+        self.assertEqual(self.manifest.get_files(), [first, second])
+        self.assertEqual(self.manifest.get_generation(), 1)
+
+        self.__write("a.jpg", b"changed photo")
+        os.remove(second)
+        changes = self.manifest.update(self.local_path)
+        self.assertEqual(
+            (changes.added, changes.updated, changes.deleted), ([], [first], [second])
+        )
+        self.assertEqual(self.manifest.get_generation(), 2)
+
+        self.assertFalse(self.manifest.update(self.local_path))
+        self.assertEqual(self.manifest.get_generation(), 2)
+
+    def test_empty_directory_is_scanned(self):
+        self.assertEqual(self.manifest.get_generation(), 0)
+        self.assertFalse(self.manifest.update(self.local_path))
+        self.assertEqual(self.manifest.get_generation(), 1)
+
+    def test_refresh_scans_changed_directory(self):
+        self.__write("a.jpg")
+        self.__age()
+        self.assertTrue(self.manifest.refresh(self.local_path))
+        self.assertIsNotNone(self.manifest.get_scanned_mtime(self.local_path))
+        self.assertFalse(self.manifest.refresh(self.local_path))
+
+        path = self.__write("b.jpg")
+        self.assertIsNone(self.manifest.get_scanned_mtime(self.local_path))
+        self.assertEqual(self.manifest.refresh(self.local_path).added, [path])
+
+    def test_recent_directory_change_is_scanned_again(self):
+        self.__write("a.jpg")
+        self.manifest.update(self.local_path)  # directory changed a moment ago
+        self.assertIsNone(self.manifest.get_scanned_mtime(self.local_path))
+
+    def test_apply(self):
+        first = self.__write("a.jpg")
+        self.manifest.update(self.local_path)
+        self.manifest.set_hashes([(first, "hash")])
+
+        second = self.__write("b.jpg")
+        changes = self.manifest.apply(
+            [first, second, os.path.join(self.local_path, "notes.txt")], []
+        )
+        self.assertEqual((changes.added, changes.updated), ([second], []))
+        self.assertEqual(self.manifest.get_hash(first), "hash")  # unchanged file
+
+        os.remove(second)
+        changes = self.manifest.apply([second], [first])
+        self.assertEqual(sorted(changes.deleted), [first, second])
+        self.assertEqual(self.manifest.get_files(), [])
+
+    def test_scanned_mtime_after_apply(self):
+        self.__write("a.jpg")
+        self.__age()
+        self.manifest.update(self.local_path)
+        scanned_mtime = self.manifest.get_scanned_mtime(self.local_path)
+
+        path = self.__write("b.jpg")  # e.g. by sync
+        self.manifest.apply([path], [])
+        self.manifest.set_scanned_mtime(self.local_path, scanned_mtime)
+        self.assertFalse(self.manifest.refresh(self.local_path))
+        self.assertEqual(len(self.manifest.get_files()), 2)
+
+    def test_scanned_mtime_is_not_set_after_rescan(self):
+        self.__write("a.jpg")
+        self.__age()
+        self.manifest.update(self.local_path)
+        scanned_mtime = self.manifest.get_scanned_mtime(self.local_path)
+
+        self.__write("b.jpg")
+        self.manifest.update(self.local_path)  # racy, stores no directory time
+        self.manifest.set_scanned_mtime(self.local_path, scanned_mtime)
+        self.assertIsNone(self.manifest.get_scanned_mtime(self.local_path))
+
+    def test_get_photos(self):
+        path = self.__write("a.jpg")
+        self.manifest.update(self.local_path)
+        photos = self.manifest.get_photos("id", "created", "source", "ePiSync")
+        self.assertEqual(list(photos.columns), ["id", "created", "source"])
+        self.assertEqual(photos["id"].tolist(), [path])
+        self.assertEqual(photos["source"].tolist(), ["ePiSync"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import contextlib
+import os
+import sqlite3
+import sys
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.template.querymanager import QueryManager  # noqa: E402
+
+# Checks of QueryManager with in-memory SQLite database shared by the pooled connections:
+# read only API connections, cache invalidation and API parameters handling.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+QUERIES = {
+    "readings": QueryManager.Query(
+        "SELECT time, value FROM readings WHERE sensor = :sensor ORDER BY time LIMIT :limit",
+        {"limit": int},
+    ),
+    "streamed": QueryManager.Query(
+        "SELECT time, value FROM readings ORDER BY time", streamed=True
+    ),
+    "add_reading": "INSERT INTO readings (time, sensor, value) VALUES (:time, :sensor, :value)",
+    "clear": "DELETE FROM readings",
+}
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        path = "file:{}?mode=memory&cache=shared".format(uuid.uuid4().hex)
+        self.database = sqlite3.connect(path, uri=True)  # keeps the database alive
+        self.database.execute(
+            "CREATE TABLE readings (time INTEGER, sensor TEXT, value REAL)"
+        )
+        self.database.executemany(
+            "INSERT INTO readings VALUES (?, ?, ?)",
+            [(1, "outside", 10.5), (2, "outside", 11.0), (3, "inside", 21.0)],
+        )
+        self.database.commit()
+        self.manager = QueryManager(path, QUERIES)
+
+    def tearDown(self):
+        self.manager.close()
+        self.database.close()
+
+
+class QueryManagerTest(DatabaseTestCase):
+    def test_query(self):
+        self.assertEqual(
+            self.manager.query("readings", sensor="outside", limit=1),
+            [{"time": 1, "value": 10.5}],
+        )
+
+    def test_write_query_is_rejected(self):
+        with self.assertRaisesRegex(sqlite3.OperationalError, "readonly"):
+            self.manager.query(
+                "add_reading", time=4, sensor="outside", value=12.0
+            )  # API uses read only connections
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 2
+        )
+
+    def test_cache_is_invalidated_by_execute(self):
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 2
+        )
+        self.database.execute("DELETE FROM readings")
+        self.database.commit()
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 2
+        )  # cached result
+
+        self.assertEqual(
+            self.manager.execute("add_reading", time=4, sensor="outside", value=12.0), 1
+        )
+        self.assertEqual(
+            self.manager.query("readings", sensor="outside", limit=10),
+            [{"time": 4, "value": 12.0}],
+        )
+
+    def test_invalidated_read_is_not_cached(self):
+        connection = self.manager._QueryManager__connection
+
+        @contextlib.contextmanager
+        def invalidated_connection(*arguments, **keywords):
+            with connection(*arguments, **keywords) as result:
+                yield result
+            self.manager.invalidate()  # write finished while reading
+
+        self.manager._QueryManager__connection = invalidated_connection
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 2
+        )
+        self.manager._QueryManager__connection = connection
+
+        self.database.execute("DELETE FROM readings")
+        self.database.commit()
+        self.assertEqual(
+            self.manager.query("readings", sensor="outside", limit=10), []
+        )  # stale result was not cached
+
+    def test_execute_many(self):
+        count = self.manager.execute(
+            "add_reading",
+            many=[
+                {"time": 4, "sensor": "outside", "value": 12.0},
+                {"time": 5, "sensor": "outside", "value": 13.0},
+            ],
+        )
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 4
+        )
+
+    def test_cached_rows_are_not_shared(self):
+        rows = self.manager.query("readings", sensor="outside", limit=1)
+        rows[0]["value"] = 0
+        rows.append({})
+        self.assertEqual(
+            self.manager.query("readings", sensor="outside", limit=1),
+            [{"time": 1, "value": 10.5}],
+        )
+
+    def test_get_parameters(self):
+        self.assertEqual(
+            self.manager.get_parameters(
+                "readings", {"sensor": "outside", "limit": "5", "other": "x"}
+            ),
+            {"sensor": "outside", "limit": 5},
+        )
+        with self.assertRaises(KeyError):
+            self.manager.get_parameters("readings", {"limit": "5"})
+        with self.assertRaises(ValueError):
+            self.manager.get_parameters("readings", {"sensor": "outside", "limit": "x"})
+
+    def test_unknown_query(self):
+        with self.assertRaisesRegex(KeyError, "Unknown query"):
+            self.manager.query("other")
+
+
+class QueryManagerAPITest(DatabaseTestCase):
+    def setUp(self):
+        from flask import Flask
+
+        super().setUp()
+        self.application = Flask(__name__)
+
+    def __get_data(self, query: str):
+        with self.application.test_request_context("/api/get_data?" + query):
+            response = self.manager.get_data_func()
+            response, status = (
+                response if isinstance(response, tuple) else (response, 200)
+            )
+            response.direct_passthrough = False  # streamed data is read at once
+            return status, response.get_json()
+
+    def test_get_data(self):
+        self.assertEqual(
+            self.__get_data("query=readings&sensor=outside&limit=1"),
+            (200, {"rows": [{"time": 1, "value": 10.5}]}),
+        )
+
+    def test_get_streamed_data(self):
+        self.assertEqual(
+            self.__get_data("query=streamed"),
+            (
+                200,
+                {
+                    "columns": ["time", "value"],
+                    "rows": [[1, 10.5], [2, 11.0], [3, 21.0]],
+                },
+            ),
+        )
+
+    def test_wrong_int_parameter(self):
+        status, data = self.__get_data("query=readings&sensor=outside&limit=x")
+        self.assertEqual(status, 400)
+        self.assertIn("error", data)
+
+    def test_missing_parameter(self):
+        self.assertEqual(
+            self.__get_data("query=readings&limit=1"),
+            (400, {"error": "Missing parameter: sensor"}),
+        )
+
+    def test_unknown_query_name(self):
+        self.assertEqual(
+            self.__get_data("query=other"), (404, {"error": "Unknown query"})
+        )
+
+    def test_write_query_fails(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.__get_data("query=clear")
+        self.assertEqual(
+            len(self.manager.query("readings", sensor="outside", limit=10)), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
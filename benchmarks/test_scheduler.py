@@ -0,0 +1,158 @@
+import datetime
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.template.scheduler import Scheduler  # noqa: E402
+
+# Checks of the shared Scheduler: cron expressions, creating one scheduler for many plugin
+# threads, interval tasks with backoff and failures, coalesced backend refresh.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+
+class Service:
+    pass
+
+
+class Backend:
+    def __init__(self):
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+
+
+class Logs:
+    def __init__(self):
+        self.lines = []
+
+    def log(self, text):
+        self.lines.append(text)
+
+
+class CronTest(unittest.TestCase):
+    @staticmethod
+    def __get_next(expression: str, date: datetime.datetime) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(
+            Scheduler.Cron(expression).get_next(date.timestamp())
+        )
+
+    def test_steps_and_ranges(self):
+        self.assertEqual(
+            self.__get_next(
+                "*/15 6-22 * * *", datetime.datetime(2024, 5, 1, 23, 10, 30)
+            ),
+            datetime.datetime(2024, 5, 2, 6, 0),
+        )
+        self.assertEqual(
+            self.__get_next("*/15 6-22 * * *", datetime.datetime(2024, 5, 1, 7, 1)),
+            datetime.datetime(2024, 5, 1, 7, 15),
+        )
+
+    def test_weekday(self):
+        # 2024-05-04 is Saturday, 7 is Sunday as well as 0
+        self.assertEqual(
+            self.__get_next("30 8 * * 7", datetime.datetime(2024, 5, 4, 12, 0)),
+            datetime.datetime(2024, 5, 5, 8, 30),
+        )
+
+    def test_wrong_expression(self):
+        with self.assertRaises(ValueError):
+            Scheduler.Cron("* * *")
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = Backend()
+        self.logs = Logs()
+        self.scheduler = Scheduler(self.backend, self.logs)
+        self.thread = threading.Thread(target=self.scheduler.run, daemon=True)
+
+    def tearDown(self):
+        self.scheduler.stop()
+        if self.thread.is_alive():
+            self.thread.join(5)
+
+    def __wait(self, condition, timeout: float = 5):
+        end = time.time() + timeout
+        while not condition():
+            self.assertLess(time.time(), end, "timed out")
+            time.sleep(0.01)
+
+    def test_get_shared_creates_one_scheduler(self):
+        service = Service()
+        barrier = threading.Barrier(8)
+        schedulers = []
+
+        def get():
+            barrier.wait()
+            schedulers.append(Scheduler.get_shared(service))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(scheduler) for scheduler in schedulers}), 1)
+        self.assertIs(Scheduler.get_shared(service), schedulers[0])
+
+    def test_interval_task(self):
+        runs = []
+        self.scheduler.add_task("task", lambda: runs.append(1), interval=0.05)
+        self.thread.start()
+        self.__wait(lambda: len(runs) >= 3)
+        self.assertGreaterEqual(self.scheduler.get_stats()["task"]["runs"], 3)
+
+    def test_returned_delay_and_failures(self):
+        calls = []
+
+        def task():
+            calls.append(time.time())
+            if len(calls) == 1:
+                raise RuntimeError("failed")
+            return 60  # backoff, next run is far
+
+        self.scheduler.add_task("task", task, interval=0.05)
+        self.thread.start()
+        self.__wait(lambda: len(calls) == 2)
+        time.sleep(0.2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.scheduler.get_stats()["task"]["failures"], 1)
+        self.assertEqual(self.logs.lines, ["Task task error - failed"])
+
+    def test_removed_task(self):
+        runs = []
+        self.scheduler.add_task("task", lambda: runs.append(1), interval=0.05)
+        self.scheduler.remove_task("task")
+        self.thread.start()
+        time.sleep(0.2)
+        self.assertEqual(runs, [])
+
+    def test_refresh_is_coalesced(self):
+        for name in ["first", "second"]:
+            self.scheduler.add_task(name, lambda: None, interval=60, refresh=True)
+        self.thread.start()
+        self.__wait(
+            lambda: all(stats["runs"] for stats in self.scheduler.get_stats().values())
+        )
+        self.assertEqual(self.backend.refreshes, 1)
+
+    def test_run_returns_when_running(self):
+        self.thread.start()
+        self.__wait(lambda: self.thread.is_alive())
+        time.sleep(0.05)
+        other = threading.Thread(target=self.scheduler.run)
+        other.start()
+        other.join(1)
+        self.assertFalse(other.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
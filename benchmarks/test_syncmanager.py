@@ -0,0 +1,101 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.ePiSync_code_tutorial.syncmanager import SyncManager  # noqa: E402
+
+# Checks of rsync itemized changes parsing with sample --out-format='%i %n' lines
+# and of stopping sync that runs too long.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+LOCAL_PATH = "/photos"
+
+
+class SyncManagerParseTest(unittest.TestCase):
+    def __parse(self, *lines: str) -> SyncManager.Result:
+        return SyncManager.parse(list(lines), LOCAL_PATH)
+
+    def test_added_file(self):
+        result = self.__parse(">f+++++++++ new.jpg")
+        self.assertEqual(result.added, [os.path.join(LOCAL_PATH, "new.jpg")])
+        self.assertEqual(result.updated, [])
+        self.assertEqual(result.deleted, [])
+
+    def test_updated_file(self):
+        result = self.__parse(">f.st...... changed.jpg", ">f..t...... touched.jpg")
+        self.assertEqual(
+            result.updated,
+            [
+                os.path.join(LOCAL_PATH, "changed.jpg"),
+                os.path.join(LOCAL_PATH, "touched.jpg"),
+            ],
+        )
+        self.assertEqual(result.added, [])
+
+    def test_locally_changed_file(self):
+        result = self.__parse("cf+++++++++ copy.jpg")
+        self.assertEqual(result.added, [os.path.join(LOCAL_PATH, "copy.jpg")])
+
+    def test_deleted_file(self):
+        result = self.__parse("*deleting   old.jpg")
+        self.assertEqual(result.deleted, [os.path.join(LOCAL_PATH, "old.jpg")])
+        self.assertEqual(result.added, [])
+
+    def test_directories_are_skipped(self):
+        result = self.__parse("cd+++++++++ sub/", ".d..t...... ./", "*deleting   sub/")
+        self.assertFalse(result)
+
+    def test_unchanged_and_sent_files_are_skipped(self):
+        result = self.__parse(".f          same.jpg", "<f.st...... sent.jpg")
+        self.assertFalse(result)
+
+    def test_short_and_empty_lines(self):
+        result = self.__parse("", ">f+++++++++", ">f+++++++++ ", "*deleting")
+        self.assertFalse(result)
+
+    def test_name_with_spaces(self):
+        result = self.__parse(">f+++++++++ summer trip/beach 1.jpg")
+        self.assertEqual(
+            result.added, [os.path.join(LOCAL_PATH, "summer trip/beach 1.jpg")]
+        )
+
+    def test_result(self):
+        result = self.__parse(
+            ">f+++++++++ a.jpg", ">f.st...... b.jpg", "*deleting   c.jpg"
+        )
+        self.assertTrue(result)
+        self.assertEqual(str(result), "added: 1, updated: 1, deleted: 1")
+
+
+class SyncManagerTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rsync = os.path.join(self.directory, "rsync")
+        with open(self.rsync, "w") as file:
+            file.write("#!/bin/sh\necho '>f+++++++++ new.jpg'\nexec sleep 10\n")
+        os.chmod(self.rsync, stat.S_IRWXU)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hanging_sync_is_stopped(self):
+        manager = SyncManager(LOCAL_PATH, "/remote")
+        manager._SyncManager__RSYNC_BIN = self.rsync  # prints one change and hangs
+        manager._SyncManager__MAX_TIME = 0.5
+        result = manager.sync()
+        self.assertEqual(result.error, "rsync stopped after 0.5 seconds")
+        self.assertEqual(
+            result.added, [os.path.join(LOCAL_PATH, "new.jpg")]
+        )  # changes made before are reported
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from PIL import Image  # noqa: E402
+
+from plugins.ePiSync_code_tutorial.manifestmanager import (  # noqa: E402
+    ManifestManager,
+)
+from plugins.ePiSync_code_tutorial.thumbnailmanager import (  # noqa: E402
+    ThumbnailManager,
+)
+from plugins.ePiSync_code_tutorial.thumbnailstore import ThumbnailStore  # noqa: E402
+
+# Checks of ePiSync ThumbnailStore with Pillow engine: derivatives shared by duplicated photos,
+# removing derivatives of deleted photos and untracked files, quota with LRU eviction.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+THUMB = ThumbnailManager.Size("thumb", 40, 30, pad=True)
+MEDIUM = ThumbnailManager.Size("medium", 80, 80)
+
+
+class ThumbnailStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.local_path = os.path.join(self.directory, "photos")
+        self.store_path = os.path.join(self.local_path, ThumbnailManager.THUMB_NAME)
+        os.mkdir(self.local_path)
+        self.manifest_path = os.path.join(self.directory, "manifest.db")
+        self.manifest = ManifestManager(self.manifest_path, {"png": "image/png"})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __get_store(self, max_size: int = 0, ahead: list = None) -> ThumbnailStore:
+        return ThumbnailStore(
+            self.store_path,
+            self.manifest,
+            ThumbnailManager("convert", 2, engine=ThumbnailManager.ENGINE_PILLOW),
+            [THUMB, MEDIUM],
+            max_size,
+            ahead,
+        )
+
+    def __write(self, name: str, seed: int) -> str:
+        path = os.path.join(self.local_path, name)
+        image = Image.effect_noise((120, 90), 40 + seed).convert("RGB")
+        image.save(path)
+        return path
+
+    def __get_derivatives(self) -> list:
+        return sorted(
+            name
+            for directory, _, names in os.walk(self.store_path)
+            for name in names
+            if name != ".scanned"
+        )
+
+    def test_duplicates_share_derivatives(self):
+        first = self.__write("a.png", 1)
+        second = os.path.join(self.local_path, "copy.png")
+        shutil.copyfile(first, second)
+        self.manifest.update(self.local_path)
+
+        store = self.__get_store()
+        stats = store.update()
+        self.assertEqual((stats.hashed, stats.created, stats.failed), (2, 1, 0))
+        self.assertEqual(len(self.__get_derivatives()), 2)  # thumb and medium
+        self.assertEqual(store.get_path(first, THUMB), store.get_path(second, THUMB))
+        with Image.open(store.get_path(first, THUMB)) as image:
+            self.assertEqual(image.size, (40, 30))
+        with Image.open(store.get_path(first, MEDIUM)) as image:
+            self.assertEqual(image.size, (80, 60))
+
+    def test_existing_derivatives_are_skipped(self):
+        path = self.__write("a.png", 1)
+        self.manifest.update(self.local_path)
+        store = self.__get_store()
+        self.assertEqual(store.update().created, 1)
+
+        content_hash = self.manifest.get_hash(path)
+        self.manifest.remove_thumbs(
+            [(content_hash, "40x30p.jpg"), (content_hash, "80x80.jpg")]
+        )  # e.g. manifest created again, files are still there
+        stats = store.update()
+        self.assertEqual((stats.created, stats.skipped), (0, 1))
+        self.assertIn("skipped: 1", str(stats))
+        self.assertIsNotNone(self.manifest.get_thumb(content_hash, "40x30p.jpg"))
+
+    def test_derivatives_of_deleted_photos_are_removed(self):
+        first, second = self.__write("a.png", 1), self.__write("b.png", 2)
+        self.manifest.update(self.local_path)
+        store = self.__get_store()
+        store.update()
+        kept = os.path.basename(store.get_path(second, THUMB))
+
+        os.remove(first)
+        self.manifest.update(self.local_path)
+        stats = store.update()
+        self.assertEqual((stats.created, stats.removed), (0, 2))
+        self.assertIn(kept, self.__get_derivatives())
+        self.assertEqual(len(self.__get_derivatives()), 2)
+
+    def test_hashing_is_limited(self):
+        for number in range(3):
+            self.__write("{}.png".format(number), number)
+        self.manifest.update(self.local_path)
+        store = self.__get_store()
+        store._ThumbnailStore__HASH_LIMIT = 2
+        self.assertEqual(store.update().hashed, 2)
+        self.assertEqual(store.update().hashed, 1)
+        self.assertEqual(self.manifest.get_files(missing_hash=True), [])
+        self.assertEqual(len(self.__get_derivatives()), 6)
+
+    def test_previews_on_demand(self):
+        path = self.__write("a.png", 1)
+        self.manifest.update(self.local_path)
+        store = self.__get_store(ahead=[THUMB])
+        store.update()
+        self.assertEqual(len(self.__get_derivatives()), 1)
+        self.assertTrue(os.path.exists(store.get_path(path, MEDIUM)))
+        self.assertEqual(len(self.__get_derivatives()), 2)
+
+    def test_get_path_hashes_and_creates(self):
+        path = self.__write("a.png", 1)
+        self.manifest.update(self.local_path)
+        store = self.__get_store()
+        target = store.get_path(path, MEDIUM)
+        self.assertTrue(os.path.exists(target))
+        self.assertEqual(self.__get_derivatives(), [os.path.basename(target)])
+        self.assertIsNone(
+            store.get_path(os.path.join(self.local_path, "missing.png"), MEDIUM)
+        )
+
+    def test_quota_evicts_least_recently_used(self):
+        paths = [self.__write("{}.png".format(number), number) for number in range(3)]
+        self.manifest.update(self.local_path)
+        self.__get_store().update()
+        hashes = [self.manifest.get_hash(path) for path in paths]
+        with sqlite3.connect(self.manifest_path) as connection:
+            for used, content_hash in enumerate(hashes):
+                connection.execute(
+                    "UPDATE thumbs SET used = ? WHERE hash = ?", (used, content_hash)
+                )  # the first photo is the least recently used
+            sizes = dict(
+                connection.execute("SELECT hash, SUM(size) FROM thumbs GROUP BY hash")
+            )
+        connection.close()
+
+        max_size = int((sizes[hashes[1]] + sizes[hashes[2]]) / 0.9) + 1
+        self.assertLess(max_size, sum(sizes.values()))
+        stats = self.__get_store(max_size).collect()
+        self.assertEqual(stats.evicted, 2)
+        self.assertIsNone(self.manifest.get_thumb(hashes[0], "40x30p.jpg"))
+        self.assertIsNotNone(self.manifest.get_thumb(hashes[2], "40x30p.jpg"))
+        self.assertLessEqual(self.manifest.get_thumbs_size(), max_size)
+        self.assertEqual(len(self.__get_derivatives()), 4)
+
+    def test_untracked_files_are_removed(self):
+        self.__write("a.png", 1)
+        self.manifest.update(self.local_path)
+        store = self.__get_store()
+        store.update()
+        marker = os.path.join(self.store_path, ".scanned")
+        os.remove(marker)
+
+        past = time.time() - 60 * 60
+        strays = []
+        for name in ["stray1.jpg", "stray2.jpg"]:
+            strays.append(os.path.join(self.store_path, "ff", name))
+            os.makedirs(os.path.dirname(strays[-1]), exist_ok=True)
+            open(strays[-1], "w").close()
+            os.utime(strays[-1], (past, past))
+        remove = os.remove
+
+        def failing_remove(path):
+            if path == strays[0]:
+                raise PermissionError("denied")
+            remove(path)
+
+        with mock.patch("os.remove", failing_remove):
+            self.assertEqual(store.collect().removed, 1)
+        self.assertTrue(os.path.exists(strays[0]))
+        self.assertFalse(os.path.exists(strays[1]))  # rest of the directory is scanned
+        self.assertFalse(os.path.exists(marker))  # scanned again next time
+
+        self.assertEqual(store.collect().removed, 1)
+        self.assertTrue(os.path.exists(marker))
+        self.assertEqual(len(self.__get_derivatives()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+stubs.install()
+
+from plugins.ePiSync_code_tutorial.watchmanager import WatchManager  # noqa: E402
+
+# Checks of ePiSync WatchManager on temporary directory: debounced changes with inotify
+# and polling, ignored temporary files, rescan after the directory is replaced and heartbeat.
+# Run from the repository root: python -m unittest discover -s benchmarks
+
+
+class Logs:
+    def __init__(self):
+        self.lines = []
+
+    def log(self, text):
+        self.lines.append(text)
+
+
+class WatchManagerTestCase(unittest.TestCase):
+    MODE = WatchManager.MODE_POLL
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "photos")
+        os.mkdir(self.path)
+        self.heartbeat = os.path.join(self.directory, "watch.heartbeat")
+        self.condition = threading.Condition()
+        self.changes = []
+        self.rescans = 0
+        self.logs = Logs()
+        self.failing = False
+        self.watcher = None
+
+    def tearDown(self):
+        if self.watcher:
+            self.watcher.stop()
+        shutil.rmtree(self.directory)
+
+    def on_changes(self, changed, deleted):
+        with self.condition:
+            self.changes.append((changed, deleted))
+            self.condition.notify_all()
+        if self.failing:
+            raise RuntimeError("failed")
+
+    def on_rescan(self):
+        with self.condition:
+            self.rescans += 1
+            self.condition.notify_all()
+
+    def start(self, **arguments) -> str:
+        self.watcher = WatchManager(
+            self.path,
+            self.on_changes,
+            self.on_rescan,
+            self.MODE,
+            debounce=0.1,
+            poll_interval=0.1,
+            heartbeat=self.heartbeat,
+            ignored=["thumb_"],
+            logging=self.logs,
+            **arguments
+        )
+        return self.watcher.start()
+
+    def wait_for(self, condition, timeout: float = 5):
+        with self.condition:
+            self.assertTrue(self.condition.wait_for(condition, timeout), "timed out")
+
+    def write(self, name: str, content: bytes = b"photo") -> str:
+        path = os.path.join(self.path, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+
+class WatchManagerPollTest(WatchManagerTestCase):
+    def test_changes(self):
+        self.assertEqual(self.start(), WatchManager.MODE_POLL)
+        path = self.write("a.jpg")
+        self.write(".a.jpg.tmp")  # temporary file of rsync
+        self.wait_for(lambda: self.changes)
+        self.assertEqual(self.changes, [([path], [])])
+
+        os.remove(path)
+        self.wait_for(lambda: len(self.changes) == 2)
+        self.assertEqual(self.changes[1], ([], [path]))
+
+    def test_heartbeat(self):
+        self.assertFalse(WatchManager.is_watched(self.heartbeat))
+        self.start()
+        self.assertTrue(WatchManager.is_watched(self.heartbeat))
+
+    def test_callback_error_is_logged(self):
+        self.failing = True
+        self.start()
+        self.write("a.jpg")
+        self.wait_for(lambda: self.changes)
+        self.write("b.jpg")  # watcher still works
+        self.wait_for(lambda: len(self.changes) == 2)
+        self.assertEqual(self.logs.lines[0], "ePiSync watcher error - failed")
+
+    def test_off(self):
+        self.MODE = WatchManager.MODE_OFF
+        self.assertEqual(self.start(), WatchManager.MODE_OFF)
+        self.assertFalse(WatchManager.is_watched(self.heartbeat))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class WatchManagerInotifyTest(WatchManagerTestCase):
+    MODE = WatchManager.MODE_INOTIFY
+
+    def test_changes_are_debounced(self):
+        self.assertEqual(self.start(), WatchManager.MODE_INOTIFY)
+        paths = [self.write("{}.jpg".format(number)) for number in range(5)]
+        self.write(".0.jpg.tmp")
+        os.mkdir(os.path.join(self.path, "thumb_"))
+        self.write("thumb_/ignored.jpg")
+        self.wait_for(lambda: self.changes)
+        time.sleep(0.3)
+        self.assertEqual(self.changes, [(paths, [])])  # one batch
+
+        os.rename(paths[0], os.path.join(self.path, "renamed.jpg"))
+        self.wait_for(lambda: len(self.changes) == 2)
+        self.assertEqual(
+            self.changes[1], ([os.path.join(self.path, "renamed.jpg")], [paths[0]])
+        )
+
+    def test_replaced_directory_is_rescanned(self):
+        self.start()
+        shutil.rmtree(self.path)
+        os.mkdir(self.path)
+        self.wait_for(lambda: self.rescans)
+        path = self.write("a.jpg")  # watched again
+        self.wait_for(lambda: self.changes)
+        self.assertEqual(self.changes, [([path], [])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,39 @@
+from __future__ import annotations
 from modules.base.pluginbase import PluginBase
 from modules.base.configbase import ConfigBase
 from misc.configproperty import ConfigProperty
 from misc.constants import Constants
-from modules.convertmanager import ConvertManager
-from modules.photomanager import PhotoManager
-from modules.pidmanager import PIDManager
-from misc.logs import Logs
-from modules.backendmanager import BackendManager
-from modules.usersmanager import UsersManager
-from modules.webuimanager import WebUIManager
 from modules.localsourcemanager import LocalSourceManager
-from modules.filteringmanager import FilteringManager
-from modules.indexmanager import IndexManager
-from PIL import Image
-from flask import request, send_file
-from flask_login import login_required
+from plugins.ePiSync_code_tutorial.fileindex import FileIndex
+from plugins.ePiSync_code_tutorial.formatcache import FormatCache
+from plugins.ePiSync_code_tutorial.imagechain import ImageChain
+from plugins.ePiSync_code_tutorial.manifestmanager import ManifestManager
+from plugins.ePiSync_code_tutorial.scheduler import Scheduler
+from plugins.ePiSync_code_tutorial.syncmanager import SyncManager
+from plugins.ePiSync_code_tutorial.thumbnailmanager import ThumbnailManager
+from plugins.ePiSync_code_tutorial.thumbnailstore import ThumbnailStore
+from plugins.ePiSync_code_tutorial.watchmanager import WatchManager
+from plugins.ePiSync_code_tutorial.watermarkmanager import WatermarkManager
+from collections import namedtuple
+from functools import cached_property
+from typing import TYPE_CHECKING
+import mimetypes
 import os
-import shutil
-import subprocess
+
+# modules used only in type hints, PIL and Flask are imported in the methods that use them
+# so the service doesn't load WebUI libraries and WebUI doesn't load PIL at start
+if TYPE_CHECKING:
+    from PIL import Image
+    from ePiframe_service import Service
+    from misc.logs import Logs
+    from modules.backendmanager import BackendManager
+    from modules.convertmanager import ConvertManager
+    from modules.filteringmanager import FilteringManager
+    from modules.indexmanager import IndexManager
+    from modules.photomanager import PhotoManager
+    from modules.pidmanager import PIDManager
+    from modules.usersmanager import UsersManager
+    from modules.webuimanager import WebUIManager
 
 
 class Plugin(PluginBase):
@@ -51,10 +67,10 @@ class Plugin(PluginBase):
                     "remote_path", self, dependency="is_enabled"
                 ),  # this is string (by default)
                 ConfigProperty(
-                    "remote_host", self, dependency="is_enabled"
-                ),  # all are dependent to is_enabled
+                    "remote_host", self, notempty=False, dependency="is_enabled"
+                ),  # all are dependent to is_enabled, empty host means local path sync
                 ConfigProperty(
-                    "remote_user", self, dependency="is_enabled"
+                    "remote_user", self, notempty=False, dependency="is_enabled"
                 ),  # and will be enabled only if is_enabled is true
                 ConfigProperty(
                     "sync_timeout",
@@ -64,6 +80,33 @@ class Plugin(PluginBase):
                     prop_type=ConfigProperty.INTEGER_TYPE,
                     dependency="is_enabled",
                 ),  # integer values with min and max thresholds
+                ConfigProperty(
+                    "sync_interval",
+                    self,
+                    minvalue=0,
+                    maxvalue=1440,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),  # 0 means sync during photo refresh
+                ConfigProperty(
+                    "sync_bandwidth_limit",
+                    self,
+                    minvalue=0,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),  # 0 means no limit
+                ConfigProperty(
+                    "sync_delete",
+                    self,
+                    prop_type=ConfigProperty.BOOLEAN_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "watch_mode",
+                    self,
+                    possible=WatchManager.MODES,
+                    dependency="is_enabled",
+                ),  # watching local path for photos added by other means than sync
                 ConfigProperty(
                     "thumb_width",
                     self,
@@ -80,11 +123,165 @@ class Plugin(PluginBase):
                     prop_type=ConfigProperty.INTEGER_TYPE,
                     dependency="is_enabled",
                 ),
+                ConfigProperty(
+                    "thumb_workers",
+                    self,
+                    minvalue=0,
+                    maxvalue=16,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),  # 0 means one worker per CPU core
+                ConfigProperty(
+                    "thumb_timeout",
+                    self,
+                    minvalue=5,
+                    maxvalue=300,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "thumb_engine",
+                    self,
+                    possible=ThumbnailManager.ENGINES,
+                    dependency="is_enabled",
+                ),  # string value from the list of possible values
+                ConfigProperty(
+                    "medium_size",
+                    self,
+                    minvalue=320,
+                    maxvalue=4096,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "previews_ahead",
+                    self,
+                    prop_type=ConfigProperty.BOOLEAN_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "derivative_format",
+                    self,
+                    possible=ThumbnailManager.FORMATS,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "derivative_quality",
+                    self,
+                    minvalue=1,
+                    maxvalue=100,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "thumb_max_size",
+                    self,
+                    minvalue=0,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),  # 0 means no limit
+                ConfigProperty(
+                    "watermark_position",
+                    self,
+                    possible=WatermarkManager.POSITIONS,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "watermark_scale",
+                    self,
+                    minvalue=1,
+                    maxvalue=50,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "watermark_opacity",
+                    self,
+                    minvalue=0,
+                    maxvalue=100,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "page_size",
+                    self,
+                    minvalue=10,
+                    maxvalue=500,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
+                ConfigProperty(
+                    "cache_max_age",
+                    self,
+                    minvalue=0,
+                    maxvalue=31536000,
+                    prop_type=ConfigProperty.INTEGER_TYPE,
+                    dependency="is_enabled",
+                ),
             ]
 
+        __CONFIG_NAME = "config.cfg"
+        __snapshot = None
+        __snapshot_mtime = None
+
+        # returns typed, read-only copy of the settings for hooks that run often, reading its
+        # attributes (e.g. settings.thumb_width) skips parsing and converting values every time
+        # the copy is built once and rebuilt only when config.cfg changes, e.g. saved in WebUI,
+        # hook takes it once, so all its steps use the same settings
+        def get_snapshot(self):
+            try:
+                mtime = os.stat(
+                    os.path.join(self.main_class.path, self.__CONFIG_NAME)
+                ).st_mtime_ns
+            except OSError:
+                mtime = None
+            if self.__snapshot is None or mtime != self.__snapshot_mtime:
+                try:
+                    if self.__snapshot is not None:
+                        self.read_config()  # reading changed file again
+                    self.verify_exceptions()  # values out of range, not possible, etc.
+                    settings = namedtuple(
+                        "Settings", [setting.get_name() for setting in self.SETTINGS]
+                    )(*[self.__get_value(setting) for setting in self.SETTINGS])
+                except Exception as exception:
+                    if self.__snapshot is None:
+                        raise
+                    self.main_class.logging.log(
+                        "ePiSync config error, previous settings are used - {}".format(
+                            exception
+                        )
+                    )
+                    # the file is not checked again until it changes
+                    self.__snapshot_mtime = mtime
+                    return self.__snapshot
+                self.__snapshot = settings
+                self.__snapshot_mtime = mtime
+            return self.__snapshot
+
+        def __get_value(self, setting: ConfigProperty):
+            if setting.get_type() == ConfigProperty.BOOLEAN_TYPE:
+                return bool(self.getint(setting.get_name()))
+            if setting.get_type() == ConfigProperty.INTEGER_TYPE:
+                return self.getint(setting.get_name())
+            if setting.get_type() == ConfigProperty.FLOAT_TYPE:
+                return float(self.get(setting.get_name()))
+            return self.get(setting.get_name())
+
     # End of PluginConfigManager class.
 
-    __THUMB_NAME = "thumb_"
+    __MANIFEST_NAME = "manifest.db"
+    __FORMATS_NAME = "formats.db"
+    __MAX_PAGE_SIZE = 500
+    __WATERMARK_PATH = "static/images/watermark.png"
+    __SYNC_LOCK_NAME = "sync.lock"
+    __MAX_SYNC_BACKOFF = 4 * 60 * 60  # seconds
+    __SYNC_TASK = "ePiSync_sync"
+    __SYNC_JITTER = 30  # seconds, spreads syncs of frames started at the same time
+    __SYNC_CHECK_INTERVAL = 60  # seconds, checking sync_interval while sync is off
+    __WATCH_HEARTBEAT_NAME = "watch.heartbeat"
+    __SIZE_THUMB = "thumb"
+    __SIZE_MEDIUM = "medium"
+    __SIZE_FRAME = "frame"
 
     def __init__(
         self,
@@ -95,6 +292,53 @@ class Plugin(PluginBase):
     ):
 
         super().__init__(path, pid_manager, logging, global_config)
+        self.__convert_bin_path = self.global_config.get("convert_bin_path")
+        self.__rotation = self.global_config.getint(
+            "rotation"
+        )  # global settings don't change during plugin life
+        self.__frame_size = max(
+            self.global_config.getint("image_width"),
+            self.global_config.getint("image_height"),
+        )  # frame derivative fits the display in both orientations
+        self.__thumbnail_store = None
+        self.__thumbnail_settings = None
+        self.__watch_heartbeat = os.path.join(self.path, self.__WATCH_HEARTBEAT_NAME)
+        self.__sync_lock = SyncManager.Lock(
+            os.path.join(self.path, self.__SYNC_LOCK_NAME)
+        )  # shared by frame refresh and service processes
+        self.__sync_failures = 0  # failed background syncs in a row
+
+    # helpers with databases are created on the first use, so the plugin that is disabled
+    # (ePiframe doesn't call its methods then) doesn't create files in the plugin path
+
+    @cached_property
+    def __manifest(self) -> ManifestManager:
+        return ManifestManager(
+            os.path.join(self.path, self.__MANIFEST_NAME),
+            Constants.EXTENSION_TO_TYPE,
+        )  # persistent index of synced photos kept in the plugin path
+
+    @cached_property
+    def __file_index(self) -> FileIndex:
+        return FileIndex(
+            self.__manifest,
+            self.config.get_snapshot().local_path,
+            self.__watch_heartbeat,
+        )  # cached lookups for API, local path is not scanned while it's watched
+
+    @cached_property
+    def __watermark(self) -> WatermarkManager:
+        return WatermarkManager(
+            os.path.join(self.path, self.__WATERMARK_PATH)
+        )  # self.path is a plugin path
+
+    @cached_property
+    def __format_cache(self) -> FormatCache:
+        return FormatCache(
+            os.path.join(self.path, self.__FORMATS_NAME),
+            self.__convert_bin_path,
+            Constants.FIRST_FRAME_GIF,
+        )  # if this is a GIF then just check the first frame
 
     # ---------------------------------------------------------------------------------------------------------------------------
 
@@ -106,32 +350,67 @@ class Plugin(PluginBase):
         source_label: str,
         photo_manager: PhotoManager,
     ):
-        cmd = "rsync --timeout={} --ignore-existing {}@{}:{}* {} 2>&1 > /dev/null"  # command string
-        source = (
-            self.config.get("remote_path")
-            if self.config.get("remote_path").endswith("/")
-            else self.config.get("remote_path") + "/"
-        )  # adding / at the end if not exists
-        os.system(
-            cmd.format(
-                self.config.get("sync_timeout"),
-                self.config.get("remote_user"),
-                self.config.get("remote_host"),
-                source,
-                self.config.get("local_path"),
-            )
-        )  # starting command with args
-
-        local_source = LocalSourceManager(
-            self.config.get("local_path"), False, Constants.EXTENSIONS
-        )  # getting synced files with LocalSourceManager
+        settings = self.config.get_snapshot()
+        if not settings.sync_interval or not self.__manifest.get_generation():
+            # sync now if it's not done in the background or never tried, a failed first sync
+            # still scans the local path, so the next refresh doesn't wait for it again
+            self.__sync(settings)
+        self.__manifest.refresh(
+            settings.local_path
+        )  # photos added or removed in local path by other means than sync
         self.SOURCE = "'{}' plugin source".format(
             self.name
         )  # it is required to set the source name
-        return local_source.get_local_photos(
+        return self.__manifest.get_photos(
             id_label, creation_label, source_label, self.SOURCE
         )  # returning dataframe of photos with needed labels
 
+    # syncs photos if no other sync is running, returns sync result or None if skipped
+    def __sync(self, settings):
+        if not self.__sync_lock.acquire():
+            return None
+        try:
+            # manifest that was up to date before sync stays so after applying its changes
+            scanned_mtime = self.__manifest.get_scanned_mtime(settings.local_path)
+            result = SyncManager(
+                settings.local_path,
+                settings.remote_path,
+                settings.remote_host,
+                settings.remote_user,
+                settings.sync_timeout,
+                settings.sync_bandwidth_limit,
+                settings.sync_delete,
+                [ThumbnailManager.THUMB_NAME],
+            ).sync()  # syncing with rsync and getting the changes it made
+            if result.error:
+                self.logging.log("ePiSync sync error - {}".format(result.error))
+
+            changes = self.__apply_changes(
+                result.added, result.updated, result.deleted, settings.local_path
+            )
+            if scanned_mtime is not None and not result.error:
+                # rsync changed the directory modification time, refresh doesn't scan it
+                self.__manifest.set_scanned_mtime(settings.local_path, scanned_mtime)
+            if changes:
+                self.logging.log("ePiSync manifest - {}".format(changes))
+        finally:
+            self.__sync_lock.release()
+        return result
+
+    # feeds the manifest only with the files that have changed, thumbnails of changed
+    # and removed photos are collected by the thumbnail store once new photos are hashed
+    def __apply_changes(
+        self, added: list, updated: list, deleted: list, local_path: str
+    ):
+        changes = (
+            self.__manifest.apply(added + updated, deleted)
+            if self.__manifest.get_generation()
+            else self.__manifest.update(local_path)
+        )  # the first run fills the manifest with the whole directory
+        if changes:
+            self.__file_index.invalidate()
+        return changes
+
     # method that retrieves the file from new photo source
     def add_photo_source_get_file(
         self,
@@ -144,34 +423,23 @@ class Plugin(PluginBase):
         photo_manage: PhotoManager,
     ):
         returned_filename = filename
-        # getting image MIME type with ImageMagick
-        error, image_type = ConvertManager().get_image_format(
-            self.global_config.get("convert_bin_path"),
-            photo[id_label],
-            Constants.FIRST_FRAME_GIF,
-        )  # if this is a GIF then just check the first frame
-        if not error and image_type:
+        image_type = self.__format_cache.get_format(
+            photo[id_label]
+        )  # getting image format from cache, file header or ImageMagick
+        if image_type:
             returned_filename = (
                 filename
                 + "."
                 + Constants.TYPE_TO_EXTENSION[Constants.MIME_START + image_type.lower()]
             )  # converting MIME type to extension
         returned_filename = os.path.join(path, returned_filename)  # combining filename
-        shutil.copy(photo[id_label], returned_filename)  # copying to target path
+        FormatCache.copy_file(
+            photo[id_label], returned_filename
+        )  # copying to target path (reflink if possible)
         return returned_filename
 
     # ---------------------------------------------------------------------------------------------------------------------------
 
-    @staticmethod
-    def __subproc(arguments):
-        # method to start process with arguments.
-        # it needs a list of arguments
-        argument = arguments.split()
-        process = subprocess.Popen(argument, stdout=subprocess.PIPE)
-        process.wait()
-        out, error = process.communicate()
-        return out, error
-
     # method that changes collected photo list
     def change_photos_list(
         self,
@@ -183,39 +451,66 @@ class Plugin(PluginBase):
         index_manager: IndexManager,
         filtering_manager: FilteringManager,
     ):
-        size = self.config.get("thumb_width") + "x" + self.config.get("thumb_height")
-        thumb_cmd = "{} {} -background white -gravity center -sample {} -extent {} {}"  # thumbnail generation command
-        rows = photo_list[
-            photo_list[source_label] == self.SOURCE
-        ]  # getting rows only from the source of this plugin
+        settings = self.config.get_snapshot()
         LocalSourceManager.create_directory(
-            os.path.join(self.config.get("local_path"), self.__THUMB_NAME + "/")
+            os.path.join(settings.local_path, ThumbnailManager.THUMB_NAME + "/")
         )  # creating thumbnails directory
 
-        for index, row in rows.iterrows():  # iterating through rows
-            thumb_file = os.path.join(
-                os.path.dirname(row[id_label]),
-                self.__THUMB_NAME + "/",
-                self.__THUMB_NAME + os.path.basename(row[id_label]),
-            )  # getting thumb path
-            if not os.path.exists(thumb_file):
-                out, error = self.__subproc(
-                    thumb_cmd.format(
-                        self.global_config.get("convert_bin_path"),
-                        row[id_label],
-                        size,
-                        size,
-                        thumb_file,
-                    )
-                )  # creating thumbnail
-                if error:
-                    raise Exception(error)
-
+        self.__update_thumbnails(settings)
         return photo_list  # returning initial photo_list as nothing has changed
 
+    def __update_thumbnails(self, settings):
+        stats = self.__get_thumbnail_store(
+            settings
+        ).update()  # hashing new photos, creating missing thumbnails in parallel and cleaning up
+        if (
+            stats.created
+            or stats.skipped
+            or stats.failed
+            or stats.removed
+            or stats.evicted
+        ):
+            self.logging.log("ePiSync thumbnails - {}".format(stats))
+        for error in stats.errors:
+            self.logging.log("ePiSync thumbnail error - {}".format(error))
+
+    # thumbnail store is created again only when the settings change
+    def __get_thumbnail_store(self, settings) -> ThumbnailStore:
+        if settings is not self.__thumbnail_settings:
+            thumb = ThumbnailManager.Size(
+                self.__SIZE_THUMB, settings.thumb_width, settings.thumb_height, pad=True
+            )  # gallery thumbnail
+            previews = [
+                ThumbnailManager.Size(
+                    self.__SIZE_FRAME, self.__frame_size, self.__frame_size
+                ),
+                ThumbnailManager.Size(
+                    self.__SIZE_MEDIUM, settings.medium_size, settings.medium_size
+                ),
+            ]  # previews that fit the sizes
+            self.__thumbnail_store = ThumbnailStore(
+                os.path.join(settings.local_path, ThumbnailManager.THUMB_NAME),
+                self.__manifest,
+                ThumbnailManager(
+                    self.__convert_bin_path,
+                    settings.thumb_workers,
+                    settings.thumb_timeout,
+                    settings.thumb_engine,
+                    Constants.FIRST_FRAME_GIF,
+                    settings.derivative_format,
+                    settings.derivative_quality,
+                ),
+                [thumb]
+                + sorted(previews, key=lambda size: size.width),  # smallest first
+                settings.thumb_max_size * 1024 * 1024,  # megabytes
+                None if settings.previews_ahead else [thumb],  # previews on demand
+            )
+            self.__thumbnail_settings = settings
+        return self.__thumbnail_store
+
     # ---------------------------------------------------------------------------------------------------------------------------
 
-    # method that postprocesses the photo
+    # method that postprocesses the photo, the photo is decoded and saved once by the image chain
     def postprocess_photo(
         self,
         final_photo: str,
@@ -229,82 +524,154 @@ class Plugin(PluginBase):
         source_label: str,
     ):
         if self.SOURCE and not photo.empty and photo[source_label] == self.SOURCE:
-            image = Image.open(final_photo)
-            mode = image.mode  # get photo mode
-            if not is_horizontal:
-                image = image.transpose(
-                    Image.ROTATE_90
-                    if self.global_config.getint("rotation") == 90
-                    else Image.ROTATE_270
-                )  # rotating image if frame not in horizontal position
-            new_image = image.convert("RGBA")  # converting to RGB with alpha
-
-            watermark = Image.open(
-                os.path.join(self.path, "static/images/watermark.png")
-            ).convert(
-                "RGBA"
-            )  # self.path is a plugin path
-            watermark = watermark.resize(
-                (width // 10, height // 10)
-            )  # resizing watermark to 1/10 of width and height
-            new_image.paste(
-                watermark,
-                (width - 10 - width // 10, height - 10 - height // 10),
-                watermark,
-            )  # pasting watermark on the photo and with watermark mask
-            new_image = new_image.convert(mode)  # convert back to original photo mode
-
-            if not is_horizontal:
-                new_image = new_image.transpose(
-                    Image.ROTATE_270
-                    if self.global_config.getint("rotation") == 90
-                    else Image.ROTATE_90
-                )  # rotating back if in vertical position
-
-            new_image.save(final_photo)  # saving as final photo
+            ImageChain.process_file(
+                final_photo,
+                lambda image: self.postprocess_image(
+                    image,
+                    width,
+                    height,
+                    is_horizontal,
+                    convert_manager,
+                    photo,
+                    id_label,
+                    creation_label,
+                    source_label,
+                ),
+            )
+
+    # image variant of postprocess_photo that takes and returns decoded photo, so when the image
+    # chain runs the hook for all plugins the photo is not decoded and saved by every plugin
+    def postprocess_image(
+        self,
+        image: Image.Image,
+        width: int,
+        height: int,
+        is_horizontal: bool,
+        convert_manager: ConvertManager,
+        photo,
+        id_label: str,
+        creation_label: str,
+        source_label: str,
+    ) -> Image.Image:
+        if not self.SOURCE or photo.empty or photo[source_label] != self.SOURCE:
+            return image
+
+        settings = self.config.get_snapshot()
+        size = WatermarkManager.get_size(
+            width, height, settings.watermark_scale
+        )  # watermark size is a percentage of width and height
+        position = WatermarkManager.get_position(
+            width, height, size, settings.watermark_position
+        )  # position in the frame orientation
+        transpose = None
+        if not is_horizontal:
+            # instead of rotating the whole photo only the small watermark is rotated
+            # and the position is moved to the original photo orientation
+            transpose = WatermarkManager.get_transpose(self.__rotation)
+            position = WatermarkManager.get_original_position(
+                position, size, image.size, self.__rotation
+            )
+        watermark = self.__watermark.get(
+            size, settings.watermark_opacity, transpose=transpose
+        )  # decoded, resized and rotated watermark is kept in memory
+        WatermarkManager.paste(
+            image, watermark, position
+        )  # pasting watermark in the photo mode with watermark mask
+        return image
 
     # ---------------------------------------------------------------------------------------------------------------------------
 
     def get_files(self):
-        return LocalSourceManager(
-            self.config.get("local_path"), False, Constants.EXTENSIONS
-        ).get_files()  # get all files with LocalSourceManager
+        return self.__file_index.get_files()  # get all files from the cached index
 
-    # login is required to use this API entry
-    @login_required
+    # login is required to use this API entry (see extend_api)
     def get_sync_image(self):
+        from flask import request
+
+        settings = self.config.get_snapshot()
         filename = str()
-        file_number = (
-            int(request.args.get("file"))
-            if "file" in request.args and request.args.get("file").isdigit()
-            else 0
-        )  # if file=<value> in URL then read file number
-        files = self.get_files()
+        if "id" in request.args:
+            file = self.__file_index.get_by_id(
+                request.args.get("id")
+            )  # if id=<value> in URL then find file by stable photo ID
+        else:
+            file = self.__file_index.get_by_position(
+                int(request.args.get("file"))
+                if "file" in request.args and request.args.get("file").isdigit()
+                else 0
+            )  # if file=<value> in URL then read file number
 
-        try:
-            # get filename or thumbnail filename if URL contains thumb argument
-            filename = (
-                files[file_number]
-                if "thumb" not in request.args
-                else os.path.join(
-                    os.path.dirname(files[file_number]),
-                    self.__THUMB_NAME + "/",
-                    self.__THUMB_NAME + os.path.basename(files[file_number]),
-                )
+        if file:
+            # size=<thumb|medium|frame|pixels> in URL picks the smallest derivative that is enough,
+            # thumb argument is the same as size=thumb, without them the original photo is sent
+            store = self.__get_thumbnail_store(settings)
+            size = store.get_size(
+                self.__SIZE_THUMB
+                if "thumb" in request.args
+                else request.args.get("size", str())
             )
-        except Exception:
-            pass
+            filename = (
+                store.get_path(file, size) if size else file
+            )  # derivative that is missing (e.g. evicted) is created now
         return (
-            send_file(
-                filename,
-                mimetype=Constants.EXTENSION_TO_TYPE[
-                    str(filename).rsplit(".")[-1].lower()
-                ],
-            )
+            self.__send_image(filename, settings.cache_max_age)
             if filename
             else "No Photo!"
         )  # send file if exists and message if it doesn't
 
+    # sends the image with validators so the browser can reuse its cached copy
+    def __send_image(self, filename: str, max_age: int):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return "No Photo!"
+
+        from flask import send_file
+
+        response = send_file(
+            filename,
+            mimetype=Constants.EXTENSION_TO_TYPE.get(
+                str(filename).rsplit(".")[-1].lower()
+            )
+            or mimetypes.guess_type(filename)[0],
+            conditional=True,  # answers If-None-Match, If-Modified-Since and Range
+            etag="{:x}-{:x}".format(stat.st_size, stat.st_mtime_ns),
+            last_modified=stat.st_mtime,
+            max_age=max_age,
+        )
+        response.cache_control.public = False
+        response.cache_control.private = True  # only logged-in user may see it
+        return response
+
+    # login is required to use this API entry (see extend_api)
+    def get_sync_list(self):
+        from flask import jsonify, request
+
+        cursor = (
+            int(request.args.get("cursor"))
+            if request.args.get("cursor", "").isdigit()
+            else 0
+        )  # position to start the page from
+        limit = min(
+            (
+                int(request.args.get("limit"))
+                if request.args.get("limit", "").isdigit()
+                else self.config.get_snapshot().page_size
+            ),
+            self.__MAX_PAGE_SIZE,
+        )  # number of photos in the page
+        sort = (
+            request.args.get("sort")
+            if request.args.get("sort") in FileIndex.SORTS
+            else FileIndex.SORT_NAME
+        )  # sort by name or date
+        items, next_cursor = self.__file_index.get_page(
+            cursor, max(limit, 1), sort, request.args.get("order") == "desc"
+        )
+        return jsonify(
+            items=items, next_cursor=next_cursor, total=len(self.get_files())
+        )
+
     # method that adds new API method
     def extend_api(
         self,
@@ -312,9 +679,92 @@ class Plugin(PluginBase):
         users_manager: UsersManager,
         backend: BackendManager,
     ):
+        from flask_login import login_required
+        from modules.webuimanager import WebUIManager
+
         return [
-            WebUIManager.SiteBind("/api/get_sync_image", self.get_sync_image)
-        ]  # bind API method with URL
+            WebUIManager.SiteBind(
+                "/api/get_sync_image", login_required(self.get_sync_image)
+            ),
+            WebUIManager.SiteBind(
+                "/api/get_sync_list", login_required(self.get_sync_list)
+            ),
+        ]  # bind API methods with URLs, login is required to use them
+
+    # ---------------------------------------------------------------------------------------------------------------------------
+
+    # method that adds new thread to ePiframe service, syncing photos in the background
+    # so the frame refresh doesn't wait for the remote host
+    def add_service_thread(self, service: Service, backend: BackendManager):
+        settings = self.config.get_snapshot()
+        if settings.watch_mode != WatchManager.MODE_OFF:
+            self.__start_watch(settings)
+        if not settings.sync_interval:
+            return  # sync is done during photo refresh
+
+        # sync runs on the scheduler shared with other plugins, the thread of the plugin
+        # that started it first runs the scheduler and the other ones end here
+        scheduler = Scheduler.get_shared(service, backend, self.logging)
+        scheduler.add_task(
+            self.__SYNC_TASK,
+            self.__sync_task,
+            interval=settings.sync_interval * 60,
+            jitter=self.__SYNC_JITTER,
+        )
+        scheduler.run()
+
+    # keeps the manifest, photos index and thumbnails up to date from local path changes
+    # made by other means than sync (e.g. Samba or USB copy) without rescanning it
+    def __start_watch(self, settings):
+        self.__on_rescan()  # changes made while the service was not running
+        try:
+            mode = WatchManager(
+                settings.local_path,
+                self.__on_changes,
+                self.__on_rescan,
+                settings.watch_mode,
+                heartbeat=self.__watch_heartbeat,
+                ignored=[ThumbnailManager.THUMB_NAME],
+                logging=self.logging,
+            ).start()
+            self.logging.log("ePiSync watching local path - {}".format(mode))
+        except OSError as exception:
+            self.logging.log("ePiSync watch error - {}".format(exception))
+
+    def __on_changes(self, changed: list, deleted: list):
+        self.__apply_watched(
+            self.__manifest.apply(changed, deleted), self.config.get_snapshot()
+        )
+
+    def __on_rescan(self):
+        settings = self.config.get_snapshot()
+        self.__apply_watched(self.__manifest.update(settings.local_path), settings)
+
+    def __apply_watched(self, changes, settings):
+        if changes:
+            self.__file_index.invalidate()
+            self.logging.log("ePiSync watch - {}".format(changes))
+            self.__update_thumbnails(settings)
+
+    # syncs photos and returns seconds to the next sync, configuration changes are applied
+    # with the next sync
+    def __sync_task(self) -> int:
+        settings = self.config.get_snapshot()
+        interval = settings.sync_interval * 60  # seconds
+        if not interval:
+            return self.__SYNC_CHECK_INTERVAL  # sync is done during photo refresh now
+
+        try:
+            result = self.__sync(settings)
+            failed = bool(result and result.error)
+        except Exception as exception:
+            self.logging.log("ePiSync sync error - {}".format(exception))
+            failed = True
+        self.__sync_failures = self.__sync_failures + 1 if failed else 0
+        return min(
+            interval * 2 ** min(self.__sync_failures, 10),
+            max(interval, self.__MAX_SYNC_BACKOFF),
+        )  # retrying less often when remote host is failing
 
     # ---------------------------------------------------------------------------------------------------------------------------
 
@@ -325,6 +775,7 @@ class Plugin(PluginBase):
         users_manager: UsersManager,
         backend: BackendManager,
     ):
+        from modules.webuimanager import WebUIManager
         from plugins.ePiSync_code_tutorial.show import Show
 
         web_manager.add_menu_entries(
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from plugins.ePiSync_code_tutorial.manifestmanager import ManifestManager
+from plugins.ePiSync_code_tutorial.watchmanager import WatchManager
+
+
+class FileIndex:
+
+    SORT_NAME = "name"
+    SORT_DATE = "date"
+    SORTS = [SORT_NAME, SORT_DATE]
+
+    __ID_LENGTH = 16
+
+    # in-memory photos index built from the manifest for constant time lookups,
+    # local path is not checked for changes while the watcher with the heartbeat file runs
+    def __init__(
+        self,
+        manifest: ManifestManager,
+        local_path: str,
+        heartbeat: Optional[str] = None,
+    ):
+        self.__manifest = manifest
+        self.__local_path = local_path
+        self.__heartbeat = heartbeat
+        self.__lock = threading.Lock()
+        self.__files = []
+        self.__created = []
+        self.__ids = {}
+        self.__orders = {}
+        self.__generation = None
+
+    # stable photo ID that doesn't depend on the photo position in the list
+    @classmethod
+    def get_id(cls, path: str) -> str:
+        return hashlib.sha1(os.path.basename(path).encode()).hexdigest()[
+            : cls.__ID_LENGTH
+        ]
+
+    # forces the index to be rebuilt on next lookup, e.g. after sync
+    def invalidate(self):
+        with self.__lock:
+            self.__generation = None
+
+    def __refresh(self):
+        if not (self.__heartbeat and WatchManager.is_watched(self.__heartbeat)):
+            self.__manifest.refresh(
+                self.__local_path
+            )  # files added or removed outside of sync, the watcher handles them otherwise
+
+        with self.__lock:
+            generation = self.__manifest.get_generation()
+            if generation != self.__generation:
+                entries = self.__manifest.get_entries()
+                self.__files = [path for path, created in entries]
+                self.__created = [created for path, created in entries]
+                self.__ids = {self.get_id(path): path for path in self.__files}
+                self.__orders = {}  # sorted positions are built on demand
+                self.__generation = generation
+
+    def get_files(self) -> List[str]:
+        self.__refresh()
+        return self.__files
+
+    def get_by_position(self, position: int) -> Optional[str]:
+        self.__refresh()
+        files = self.__files
+        return files[position] if 0 <= position < len(files) else None
+
+    def get_by_id(self, photo_id: str) -> Optional[str]:
+        self.__refresh()
+        return self.__ids.get(photo_id)
+
+    def __get_order(self, sort: str) -> List[int]:
+        with self.__lock:
+            order = self.__orders.get(sort)
+            if order is None:
+                order = (
+                    sorted(range(len(self.__files)), key=self.__created.__getitem__)
+                    if sort == self.SORT_DATE
+                    else range(len(self.__files))
+                )  # files are already sorted by name
+                self.__orders[sort] = order
+        return order
+
+    # returns list of photo entries starting from cursor and the next cursor (None if it's the last page)
+    def get_page(
+        self, cursor: int, limit: int, sort: str = SORT_NAME, descending: bool = False
+    ) -> Tuple[List[Dict], Optional[int]]:
+        self.__refresh()
+        files = self.__files
+        created = self.__created
+        order = self.__get_order(sort)
+        count = len(order)
+        positions = (
+            [
+                order[count - 1 - index]
+                for index in range(cursor, min(cursor + limit, count))
+            ]
+            if descending
+            else order[cursor : cursor + limit]
+        )
+        items = [
+            {
+                "id": self.get_id(files[position]),
+                "file": position,
+                "name": os.path.basename(files[position]),
+                "created": created[position],
+            }
+            for position in positions
+        ]
+        return items, cursor + limit if cursor + limit < count else None
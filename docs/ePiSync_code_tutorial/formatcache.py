@@ -0,0 +1,113 @@
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+from typing import Optional
+
+
+# Helper that recognizes photo format for add_photo_source_get_file without starting ImageMagick.
+# Formats are sniffed from magic bytes (JPEG, PNG, GIF, HEIC, WebP, BMP) and only unknown ones
+# are checked with convert, results are stored in persistent cache keyed by path, size and mtime.
+# Returned format names are the same as ImageMagick ones, e.g. 'JPEG', so they can be used with
+# Constants.TYPE_TO_EXTENSION[Constants.MIME_START + image_type.lower()].
+# Usage inside the plugin:
+# from plugins.ePiSync_code_tutorial.formatcache import FormatCache
+# self.format_cache = FormatCache(os.path.join(self.path, 'formats.db'), self.global_config.get('convert_bin_path'), Constants.FIRST_FRAME_GIF)
+# image_type = self.format_cache.get_format(photo[id_label])
+class FormatCache:
+
+    __TIMEOUT = 30
+    __HEADER_SIZE = 64
+    __FICLONE = 0x40049409  # Linux ioctl that makes copy-on-write file copy (reflink)
+    __HEIC_BRANDS = [b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis"]
+    __HEIF_BRANDS = [b"mif1", b"msf1"]  # generic brands, compatible ones tell more
+    __SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS formats ("
+        "path TEXT PRIMARY KEY, "
+        "size INTEGER NOT NULL, "
+        "mtime INTEGER NOT NULL, "
+        "format TEXT)"
+    )
+
+    def __init__(self, path: str, convert_bin_path: str, first_frame: str):
+        self.__path = path
+        self.__convert_bin_path = convert_bin_path
+        self.__first_frame = first_frame
+        with closing(self.__connect()) as connection:
+            connection.execute(self.__SCHEMA)
+            connection.commit()
+
+    def __connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.__path, timeout=self.__TIMEOUT)
+
+    # returns ImageMagick like format name of the file or None if it's not recognized
+    def get_format(self, filename: str) -> Optional[str]:
+        stat = os.stat(filename)
+        with closing(self.__connect()) as connection:
+            row = connection.execute(
+                "SELECT format FROM formats WHERE path = ? AND size = ? AND mtime = ?",
+                (filename, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+            if row:
+                return row[0]
+
+            image_format = self.sniff(filename) or self.__get_convert_format(filename)
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO formats (path, size, mtime, format) "
+                    "VALUES (?, ?, ?, ?)",
+                    (filename, stat.st_size, stat.st_mtime_ns, image_format),
+                )
+        return image_format
+
+    def __get_convert_format(self, filename: str) -> Optional[str]:
+        from modules.convertmanager import ConvertManager
+
+        error, image_type = ConvertManager().get_image_format(
+            self.__convert_bin_path, filename, self.__first_frame
+        )  # the external process is started only for unknown formats
+        return image_type.upper() if not error and image_type else None
+
+    # recognizes the format from the first bytes of the file
+    @classmethod
+    def sniff(cls, filename: str) -> Optional[str]:
+        with open(filename, "rb") as file:
+            header = file.read(cls.__HEADER_SIZE)
+
+        if header.startswith(b"\xff\xd8\xff"):
+            return "JPEG"
+        if header.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "PNG"
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return "GIF"
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return "WEBP"
+        if header[:2] == b"BM" and len(header) >= 26:
+            return "BMP"
+        if header[4:8] == b"ftyp":
+            brand = header[8:12]
+            compatible = [
+                header[index : index + 4]
+                for index in range(
+                    16, min(int.from_bytes(header[:4], "big"), len(header)), 4
+                )
+            ]
+            if brand in cls.__HEIC_BRANDS or (
+                brand in cls.__HEIF_BRANDS
+                and any(item in cls.__HEIC_BRANDS for item in compatible)
+            ):
+                return "HEIC"
+        return None
+
+    # copies the file with reflink where the filesystem allows (Btrfs, XFS), otherwise the regular way
+    # hard links are not used as the photo is modified in place by the next processing steps
+    @classmethod
+    def copy_file(cls, source: str, target: str):
+        try:
+            import fcntl
+
+            with open(source, "rb") as source_file, open(target, "wb") as target_file:
+                fcntl.ioctl(target_file.fileno(), cls.__FICLONE, source_file.fileno())
+            shutil.copymode(source, target)
+        except (ImportError, OSError):
+            shutil.copy(source, target)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+from typing import Callable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Helper for preprocess_photo and postprocess_photo that passes decoded PIL image between the steps
+# instead of the file path, so the photo is decoded once at the start and encoded once at the end
+# (every open and save round trip costs time and JPEG quality). Steps that work on the path
+# (i.e. plugins without image variant of the hook) still work - the image is saved before them
+# and decoded again after them only when needed.
+# Plugin opts in with the image variant of the hook that takes and returns PIL image:
+# postprocess_image(image, width, height, is_horizontal, convert_manager, photo, id_label, creation_label, source_label)
+# preprocess_image(image, is_horizontal, convert_manager, photo, id_label, creation_label, source_label)
+# Usage inside the plugin, for path based hook calls:
+# from plugins.ePiSync_code_tutorial.imagechain import ImageChain
+# ImageChain.process_file(final_photo, lambda image: self.postprocess_image(image, width, height, ...))
+# and running the hook of all plugins with one decode and encode (e.g. by plugins manager):
+# ImageChain.run_hook(plugins, final_photo, 'postprocess_image', 'postprocess_photo', width, height, ...)
+class ImageChain:
+
+    # attributes of the source image kept when saving
+    __KEPT_INFO = ["icc_profile", "exif", "dpi"]
+    __JPEG_QUALITY = 95  # only one encode, so it can be high
+
+    # options are passed to PIL save, format of the source file is kept by default
+    def __init__(self, path: str, options: Optional[dict] = None):
+        self.__path = path
+        self.__options = options or {}
+        self.__image = None
+        self.__format = None
+        self.__info = {}
+        self.__modified = False
+        self.decodes = 0
+        self.encodes = 0
+
+    def __enter__(self):
+        return self
+
+    # saves the image if all steps went well, photo file stays untouched otherwise
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.save()
+
+    # returns the decoded image, decoding it only once (or again after path step)
+    def get_image(self) -> Image.Image:
+        if self.__image is None:
+            from PIL import Image
+
+            with Image.open(self.__path) as image:
+                image.load()  # file can be overwritten later
+            self.__format = image.format
+            self.__info = {
+                key: image.info[key] for key in self.__KEPT_INFO if key in image.info
+            }
+            self.__image = image
+            self.decodes += 1
+        return self.__image
+
+    # runs step that takes the image and returns it (or None if modified in place)
+    def apply(self, function: Callable[[Image.Image], Optional[Image.Image]]):
+        result = function(self.get_image())
+        if result is not None:
+            self.__image = result
+        self.__modified = True
+
+    # runs step that works on the photo file, the image is saved before and decoded after it
+    def apply_path(self, function: Callable[[str], None]):
+        self.save()
+        function(self.__path)
+        self.__image = None
+
+    # encodes the image to the photo file if it was changed
+    def save(self):
+        if not self.__modified:
+            return
+        options = dict(self.__info)
+        options["format"] = self.__format
+        if self.__format == "JPEG":
+            options["quality"] = self.__JPEG_QUALITY
+        options.update(self.__options)
+        image = self.__image
+        if options["format"] == "JPEG" and image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")  # e.g. RGBA result of the step
+        image.save(self.__path, **options)
+        self.__modified = False
+        self.encodes += 1
+
+    # decodes the photo, runs the function on it and saves it - image variant of the hook
+    # used from the path based one
+    @classmethod
+    def process_file(
+        cls,
+        path: str,
+        function: Callable[[Image.Image], Optional[Image.Image]],
+        options: Optional[dict] = None,
+    ):
+        with cls(path, options) as chain:
+            chain.apply(function)
+
+    # runs the hook of all plugins in order with one decode and encode, image_hook variant
+    # is used when plugin has it, path_hook otherwise, arguments are passed after the image or path
+    @classmethod
+    def run_hook(
+        cls,
+        plugins: List,
+        path: str,
+        image_hook: str,
+        path_hook: str,
+        *arguments,
+        options: Optional[dict] = None,
+    ) -> ImageChain:
+        with cls(path, options) as chain:
+            for plugin in plugins:
+                if hasattr(plugin, image_hook):
+                    method = getattr(plugin, image_hook)
+                    chain.apply(lambda image: method(image, *arguments))
+                elif hasattr(plugin, path_hook):
+                    method = getattr(plugin, path_hook)
+                    chain.apply_path(lambda file: method(file, *arguments))
+        return chain
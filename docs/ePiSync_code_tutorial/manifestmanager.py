@@ -0,0 +1,381 @@
+from __future__ import annotations
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported when the photos are collected
+
+
+class ManifestManager:
+
+    __TIMEOUT = 30
+    __DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+    __VERSION = 3  # stored in PRAGMA user_version, increase when the schema changes
+    # directory changed that recently may still change within the same mtime tick
+    __RACY_TIME = 2 * 10**9  # nanoseconds
+    __SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS photos ("
+        "path TEXT PRIMARY KEY, "
+        "size INTEGER NOT NULL, "
+        "mtime INTEGER NOT NULL, "
+        "created TEXT NOT NULL, "
+        "mime TEXT, "
+        "hash TEXT)"
+    )
+    __HASH_INDEX_SCHEMA = "CREATE INDEX IF NOT EXISTS photos_hash ON photos (hash)"
+    __THUMBS_SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS thumbs ("
+        "hash TEXT NOT NULL, "
+        "key TEXT NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "used INTEGER NOT NULL, "
+        "PRIMARY KEY (hash, key))"
+    )
+    __META_SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)"
+    )
+
+    # changes applied to the manifest during update
+    class Changes:
+        def __init__(self):
+            self.added = []
+            self.updated = []
+            self.deleted = []
+
+        def __bool__(self):
+            return bool(self.added or self.updated or self.deleted)
+
+        def __str__(self):
+            return "added: {}, updated: {}, deleted: {}".format(
+                len(self.added), len(self.updated), len(self.deleted)
+            )
+
+    # path is the manifest database file, extension_to_type maps file extensions to MIME types
+    def __init__(self, path: str, extension_to_type: Dict[str, str]):
+        self.__path = path
+        self.__extension_to_type = {
+            extension.lower().lstrip("."): mime
+            for extension, mime in extension_to_type.items()
+        }
+        with closing(self.__connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")  # readers don't block sync
+            self.__migrate(connection)
+
+    def __connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.__path, timeout=self.__TIMEOUT)
+
+    # the manifest only mirrors the directory state, so older schemas are dropped
+    # and the next sync fills it again with the whole directory
+    def __migrate(self, connection: sqlite3.Connection):
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        with connection:
+            connection.execute(self.__META_SCHEMA)
+            if version != self.__VERSION:
+                connection.execute("DROP TABLE IF EXISTS photos")
+                connection.execute("DROP TABLE IF EXISTS thumbs")
+                connection.execute(
+                    "DELETE FROM meta WHERE name IN ('generation', 'local_mtime')"
+                )
+            connection.execute(self.__SCHEMA)
+            connection.execute(self.__HASH_INDEX_SCHEMA)
+            connection.execute(self.__THUMBS_SCHEMA)
+            connection.execute("PRAGMA user_version = {}".format(self.__VERSION))
+
+    # scans the local path (not recursively) and stores only the differences
+    def update(self, local_path: str) -> Changes:
+        changes = self.Changes()
+        # taken before the scan, so changes made during it are seen by the next refresh
+        local_mtime = self.__get_mtime(local_path)
+        if local_mtime is not None and time.time_ns() - local_mtime < self.__RACY_TIME:
+            local_mtime = None  # the next refresh scans again
+        with closing(self.__connect()) as connection:
+            known = {
+                path: (size, mtime)
+                for path, size, mtime in connection.execute(
+                    "SELECT path, size, mtime FROM photos"
+                )
+            }
+            rows = []
+            with os.scandir(local_path) as entries:
+                for entry in entries:
+                    mime = self.__get_mime(entry.name)
+                    if not mime or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    state = known.pop(entry.path, None)
+                    if state == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    (changes.updated if state else changes.added).append(entry.path)
+                    rows.append(self.__get_row(entry.path, stat, mime))
+            changes.deleted = list(known)
+
+            with connection:
+                self.__store(connection, rows)
+                connection.executemany(
+                    "DELETE FROM photos WHERE path = ?",
+                    [(path,) for path in changes.deleted],
+                )
+                if changes or not self.__get_generation(connection):
+                    self.__bump_generation(connection)  # scanned at least once
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('local_mtime', ?)",
+                    (local_mtime,),
+                )
+        return changes
+
+    # scans the local path only when its modification time changed since the last scan
+    # (files added, removed or renamed there outside of sync), cheap enough for every refresh
+    def refresh(self, local_path: str) -> Changes:
+        mtime = self.__get_mtime(local_path)
+        if mtime is None:
+            return self.Changes()  # directory is not available now
+        if self.get_scanned_mtime(local_path) == mtime:
+            return self.Changes()
+        return self.update(local_path)
+
+    # returns the local path modification time if the manifest is up to date with it,
+    # None if the next refresh would scan the directory
+    def get_scanned_mtime(self, local_path: str) -> Optional[int]:
+        mtime = self.__get_mtime(local_path)
+        with closing(self.__connect()) as connection:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE name = 'local_mtime'"
+            ).fetchone()
+        return mtime if mtime is not None and row and row[0] == mtime else None
+
+    # stores the current local path modification time after the changes made there
+    # since scanned_mtime were applied (e.g. reported by sync), so the next refresh
+    # doesn't scan the directory again, nothing is stored if it was rescanned meanwhile
+    def set_scanned_mtime(self, local_path: str, scanned_mtime: int):
+        mtime = self.__get_mtime(local_path)
+        if mtime is None:
+            return
+        with closing(self.__connect()) as connection, connection:
+            connection.execute(
+                "UPDATE meta SET value = ? WHERE name = 'local_mtime' AND value = ?",
+                (mtime, scanned_mtime),
+            )
+
+    @staticmethod
+    def __get_mtime(local_path: str) -> Optional[int]:
+        try:
+            return os.stat(local_path).st_mtime_ns
+        except OSError:
+            return None
+
+    # stores only the given changes, e.g. reported by sync, without scanning the directory,
+    # files with the same size and modification time are skipped (e.g. reported by sync
+    # and then by the watcher), so their content hash is not reset
+    def apply(self, changed: List[str], deleted: List[str]) -> Changes:
+        changes = self.Changes()
+        with closing(self.__connect()) as connection:
+            rows = []
+            for path in changed:
+                mime = self.__get_mime(path)
+                if not mime:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    deleted = deleted + [path]
+                    continue
+                known = connection.execute(
+                    "SELECT size, mtime FROM photos WHERE path = ?", (path,)
+                ).fetchone()
+                if known == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                (changes.updated if known else changes.added).append(path)
+                rows.append(self.__get_row(path, stat, mime))
+
+            with connection:
+                self.__store(connection, rows)
+                for path in deleted:
+                    if connection.execute(
+                        "DELETE FROM photos WHERE path = ?", (path,)
+                    ).rowcount:
+                        changes.deleted.append(path)
+                if changes:
+                    self.__bump_generation(connection)
+        return changes
+
+    @staticmethod
+    def __bump_generation(connection: sqlite3.Connection):
+        connection.execute(
+            "INSERT INTO meta (name, value) VALUES ('generation', 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+        )
+
+    # returns the number that changes every time the photos list changes,
+    # 0 until the local path is scanned for the first time
+    def get_generation(self) -> int:
+        with closing(self.__connect()) as connection:
+            return self.__get_generation(connection)
+
+    @staticmethod
+    def __get_generation(connection: sqlite3.Connection) -> int:
+        row = connection.execute(
+            "SELECT value FROM meta WHERE name = 'generation'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def __get_mime(self, filename: str) -> str:
+        return self.__extension_to_type.get(
+            os.path.splitext(filename)[1].lower().lstrip(".")
+        )
+
+    def __get_row(self, path: str, stat: os.stat_result, mime: str) -> Tuple:
+        return (
+            path,
+            stat.st_size,
+            stat.st_mtime_ns,
+            time.strftime(self.__DATE_FORMAT, time.gmtime(stat.st_mtime)),
+            mime,
+        )
+
+    @staticmethod
+    def __store(connection: sqlite3.Connection, rows: List[Tuple]):
+        # changed photos get their content hash reset
+        connection.executemany(
+            "INSERT OR REPLACE INTO photos (path, size, mtime, created, mime, hash) "
+            "VALUES (?, ?, ?, ?, ?, NULL)",
+            rows,
+        )
+
+    # returns photos DataFrame with the same columns as LocalSourceManager.get_local_photos
+    def get_photos(
+        self, id_label: str, creation_label: str, source_label: str, source: str
+    ) -> pd.DataFrame:
+        import pandas as pd
+
+        with closing(self.__connect()) as connection:
+            rows = connection.execute(
+                "SELECT path, created FROM photos ORDER BY path"
+            ).fetchall()
+        photos = pd.DataFrame(rows, columns=[id_label, creation_label])
+        photos[source_label] = source
+        return photos
+
+    # returns sorted list of photo paths, optionally only the ones without content hash
+    def get_files(self, missing_hash: bool = False) -> List[str]:
+        with closing(self.__connect()) as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    "SELECT path FROM photos {}ORDER BY path".format(
+                        "WHERE hash IS NULL " if missing_hash else ""
+                    )
+                )
+            ]
+
+    # returns up to limit paths of photos without content hash, newest photos first
+    def get_unhashed_files(self, limit: int) -> List[str]:
+        with closing(self.__connect()) as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    "SELECT path FROM photos WHERE hash IS NULL "
+                    "ORDER BY created DESC, path LIMIT ?",
+                    (limit,),
+                )
+            ]
+
+    # returns sorted list of photo paths with creation dates
+    def get_entries(self) -> List[Tuple[str, str]]:
+        with closing(self.__connect()) as connection:
+            return connection.execute(
+                "SELECT path, created FROM photos ORDER BY path"
+            ).fetchall()
+
+    # stores content hashes of the photos as (path, hash) pairs
+    def set_hashes(self, hashes: List[Tuple[str, str]]):
+        with closing(self.__connect()) as connection, connection:
+            connection.executemany(
+                "UPDATE photos SET hash = ? WHERE path = ?",
+                [(content_hash, path) for path, content_hash in hashes],
+            )
+
+    def get_hash(self, path: str) -> Optional[str]:
+        with closing(self.__connect()) as connection:
+            row = connection.execute(
+                "SELECT hash FROM photos WHERE path = ?", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    # returns (hash, path, missing keys) of contents without some of the derivatives (by key),
+    # newest photos first, photos with the same content share derivatives so every hash is listed once
+    def get_missing_thumbs(self, keys: List[str]) -> List[Tuple[str, str, List[str]]]:
+        with closing(self.__connect()) as connection:
+            existing = {}
+            for content_hash, key in connection.execute(
+                "SELECT hash, key FROM thumbs WHERE key IN ({})".format(
+                    ", ".join("?" * len(keys))
+                ),
+                keys,
+            ):
+                existing.setdefault(content_hash, set()).add(key)
+            missing = []
+            for content_hash, path in connection.execute(
+                "SELECT hash, MIN(path) FROM photos WHERE hash IS NOT NULL "
+                "GROUP BY hash ORDER BY MAX(created) DESC"
+            ):
+                known = existing.get(content_hash, ())
+                if len(known) < len(keys):
+                    missing.append(
+                        (content_hash, path, [key for key in keys if key not in known])
+                    )
+        return missing
+
+    # returns the time the derivative was last used or None if it doesn't exist
+    def get_thumb(self, content_hash: str, key: str) -> Optional[int]:
+        with closing(self.__connect()) as connection:
+            row = connection.execute(
+                "SELECT used FROM thumbs WHERE hash = ? AND key = ?",
+                (content_hash, key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def add_thumb(self, content_hash: str, key: str, size: int):
+        with closing(self.__connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO thumbs (hash, key, size, used) "
+                "VALUES (?, ?, ?, ?)",
+                (content_hash, key, size, int(time.time())),
+            )
+
+    def touch_thumb(self, content_hash: str, key: str):
+        with closing(self.__connect()) as connection, connection:
+            connection.execute(
+                "UPDATE thumbs SET used = ? WHERE hash = ? AND key = ?",
+                (int(time.time()), content_hash, key),
+            )
+
+    # returns (hash, key) of derivatives that no photo refers to
+    def get_orphan_thumbs(self) -> List[Tuple[str, str]]:
+        with closing(self.__connect()) as connection:
+            return connection.execute(
+                "SELECT hash, key FROM thumbs WHERE NOT EXISTS "
+                "(SELECT 1 FROM photos WHERE photos.hash = thumbs.hash)"
+            ).fetchall()
+
+    # returns (hash, key, size) of all derivatives, least recently used first
+    def get_thumbs(self) -> List[Tuple[str, str, int]]:
+        with closing(self.__connect()) as connection:
+            return connection.execute(
+                "SELECT hash, key, size FROM thumbs ORDER BY used"
+            ).fetchall()
+
+    def get_thumbs_size(self) -> int:
+        with closing(self.__connect()) as connection:
+            return connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM thumbs"
+            ).fetchone()[0]
+
+    def remove_thumbs(self, thumbs: List[Tuple[str, str]]):
+        with closing(self.__connect()) as connection, connection:
+            connection.executemany(
+                "DELETE FROM thumbs WHERE hash = ? AND key = ?",
+                thumbs,
+            )
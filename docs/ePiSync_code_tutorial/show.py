@@ -18,11 +18,12 @@ class Show:
         @show_bp.route("/episync")  # this is the URL of the site
         @login_required  # user login is needed to visit.
         def show():
+            settings = self.plugin.config.get_snapshot()
             return render_template(
                 "show.html",
-                number=len(self.plugin.get_files()),
-                width=self.plugin.config.get("thumb_width"),
-                height=self.plugin.config.get("thumb_height"),
+                page_size=settings.page_size,
+                width=settings.thumb_width,
+                height=settings.thumb_height,
             )
 
         return show_bp
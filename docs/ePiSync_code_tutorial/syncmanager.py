@@ -0,0 +1,157 @@
+import fcntl
+import os
+import subprocess
+from typing import List
+
+
+class SyncManager:
+
+    __RSYNC_BIN = "rsync"
+    __OUT_FORMAT = "%i %n"  # 11 characters of itemized changes, space and file name
+    __NAME_START = 12
+    __DELETING = "*deleting"
+    __MAX_TIME = 60 * 60  # seconds, longer sync is stopped, the next one continues it
+
+    # lock file that allows only one sync at the time, also between processes
+    # lock is released by the system when the process ends
+    class Lock:
+        def __init__(self, path: str):
+            self.__path = path
+            self.__file = None
+
+        # returns False if other sync is running
+        def acquire(self) -> bool:
+            file = open(self.__path, "a+")
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+            file.seek(0)
+            file.truncate()
+            file.write(str(os.getpid()))  # PID of the syncing process for reference
+            file.flush()
+            self.__file = file
+            return True
+
+        def release(self):
+            if self.__file:
+                fcntl.flock(self.__file, fcntl.LOCK_UN)
+                self.__file.close()
+                self.__file = None
+
+    # synced files changes with local paths
+    class Result:
+        def __init__(self):
+            self.added = []
+            self.updated = []
+            self.deleted = []
+            self.error = None
+
+        def __bool__(self):
+            return bool(self.added or self.updated or self.deleted)
+
+        def __str__(self):
+            return "added: {}, updated: {}, deleted: {}".format(
+                len(self.added), len(self.updated), len(self.deleted)
+            )
+
+    # empty remote_host means that remote_path is a local directory
+    def __init__(
+        self,
+        local_path: str,
+        remote_path: str,
+        remote_host: str = str(),
+        remote_user: str = str(),
+        timeout: int = 5,
+        bandwidth_limit: int = 0,
+        delete: bool = False,
+        excludes: List[str] = None,
+    ):
+        self.__local_path = local_path
+        self.__remote_path = remote_path
+        self.__remote_host = remote_host
+        self.__remote_user = remote_user
+        self.__timeout = timeout
+        self.__bandwidth_limit = bandwidth_limit
+        self.__delete = delete
+        self.__excludes = excludes or []
+
+    def get_source(self) -> str:
+        source = (
+            self.__remote_path
+            if self.__remote_path.endswith("/")
+            else self.__remote_path + "/"
+        )  # adding / at the end if not exists to sync the directory content
+        if self.__remote_host:
+            source = "{}:{}".format(self.__remote_host, source)
+            if self.__remote_user:
+                source = "{}@{}".format(self.__remote_user, source)
+        return source
+
+    def get_arguments(self) -> List[str]:
+        arguments = [
+            self.__RSYNC_BIN,
+            "--dirs",  # directory content without recursion
+            "--times",  # keep modification times so changed files can be recognized,
+            # files changed on the remote host are synced again and overwrite local edits
+            "--timeout={}".format(self.__timeout),
+            "--out-format={}".format(self.__OUT_FORMAT),
+        ]
+        if self.__bandwidth_limit:
+            arguments.append("--bwlimit={}".format(self.__bandwidth_limit))
+        if self.__delete:
+            arguments.append("--delete")
+        for exclude in self.__excludes:
+            arguments.append(
+                "--exclude=/{}/".format(exclude)
+            )  # excluded files are protected from deletion too
+        arguments += [self.get_source(), os.path.join(self.__local_path, "")]
+        return arguments
+
+    # runs rsync and returns the changes it made
+    def sync(self) -> Result:
+        try:
+            process = subprocess.run(
+                self.get_arguments(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=self.__MAX_TIME,
+            )
+        except subprocess.TimeoutExpired as exception:
+            output = exception.stdout or str()
+            if isinstance(output, bytes):
+                output = os.fsdecode(output)  # not decoded when rsync is killed
+            result = self.parse(output.splitlines(), self.__local_path)
+            result.error = "rsync stopped after {} seconds".format(self.__MAX_TIME)
+            return result
+        except OSError as exception:
+            result = self.Result()
+            result.error = str(exception)
+            return result
+
+        result = self.parse(
+            process.stdout.splitlines(), self.__local_path
+        )  # partial transfer still reports the changes
+        if process.returncode:
+            result.error = process.stderr.strip() or "rsync exit code {}".format(
+                process.returncode
+            )
+        return result
+
+    # parses rsync itemized changes lines (--out-format='%i %n')
+    @classmethod
+    def parse(cls, lines: List[str], local_path: str) -> Result:
+        result = cls.Result()
+        for line in lines:
+            name = line[cls.__NAME_START :]
+            if not name:
+                continue
+            path = os.path.join(local_path, name)
+            if line.startswith(cls.__DELETING):
+                if not name.endswith("/"):
+                    result.deleted.append(path)
+            elif line[0] in ">c" and line[1] == "f":  # received regular file
+                (result.added if line[2] == "+" else result.updated).append(path)
+        return result
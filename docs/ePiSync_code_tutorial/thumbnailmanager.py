@@ -0,0 +1,238 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+
+class ThumbnailManager:
+
+    THUMB_NAME = "thumb_"
+    ENGINE_CONVERT = "convert"
+    ENGINE_PILLOW = "pillow"
+    ENGINES = [ENGINE_CONVERT, ENGINE_PILLOW]
+    FORMAT_JPEG = "jpeg"
+    FORMAT_WEBP = "webp"
+    FORMATS = [FORMAT_JPEG, FORMAT_WEBP]
+
+    __EXTENSIONS = {FORMAT_JPEG: "jpg", FORMAT_WEBP: "webp"}
+    __TEMPORARY_PREFIX = "."
+
+    # size of the derivative, padded one fills the whole box with white background
+    # (like the gallery thumbnails), the other ones only fit in the box
+    class Size:
+        def __init__(self, name: str, width: int, height: int, pad: bool = False):
+            self.name = name
+            self.width = width
+            self.height = height
+            self.pad = pad
+
+        # size key used in derivative file names, e.g. 200x120p
+        def get_key(self) -> str:
+            return "{}x{}{}".format(self.width, self.height, "p" if self.pad else "")
+
+    # derivatives generation summary
+    class Stats:
+        def __init__(self):
+            self.created = 0
+            self.skipped = 0  # existing ones or created by other writer meanwhile
+            self.failed = 0
+            self.errors = []
+            self.thumbs = []  # derivative files that were created or already existed
+
+        def __str__(self):
+            return "created: {}, skipped: {}, failed: {}".format(
+                self.created, self.skipped, self.failed
+            )
+
+    # workers value 0 means one worker per CPU core, first_frame is added to convert source
+    # so only one derivative is created for animated photos, quality is JPEG/WebP quality
+    def __init__(
+        self,
+        convert_bin_path: str,
+        workers: int = 0,
+        timeout: int = 30,
+        engine: str = ENGINE_CONVERT,
+        first_frame: str = str(),
+        image_format: str = FORMAT_JPEG,
+        quality: int = 80,
+    ):
+        self.__convert_bin_path = convert_bin_path
+        self.__first_frame = first_frame
+        self.__workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.__timeout = timeout
+        self.__format = image_format
+        self.__quality = quality
+        self.__create = (
+            self.__create_with_pillow
+            if engine == self.ENGINE_PILLOW
+            else self.__create_with_convert
+        )
+
+    # extension of the derivative files
+    def get_extension(self) -> str:
+        return self.__EXTENSIONS[self.__format]
+
+    # generates derivatives of (source, [(size, target), ...]) jobs with a bounded pool of workers,
+    # every source is decoded once for all its sizes
+    def create_thumbnails(
+        self, jobs: List[Tuple[str, List[Tuple[Size, str]]]]
+    ) -> Stats:
+        stats = self.Stats()
+        if jobs:
+            # threads are enough here as the work is done by external processes
+            # or by Pillow that releases GIL while decoding and resizing
+            with ThreadPoolExecutor(
+                max_workers=min(self.__workers, len(jobs))
+            ) as executor:
+                futures = {
+                    executor.submit(self.__create_files, source, outputs): (
+                        source,
+                        outputs,
+                    )
+                    for source, outputs in jobs
+                }
+                for future in as_completed(futures):
+                    source, outputs = futures[future]
+                    created, error = future.result()
+                    if error:
+                        stats.failed += 1
+                        stats.errors.append("{}: {}".format(source, error))
+                        continue
+                    if created:
+                        stats.created += 1
+                    else:
+                        stats.skipped += 1
+                    stats.thumbs += [target for size, target in outputs]
+        return stats
+
+    # creates the derivatives under temporary names so readers never get a partial file,
+    # names are unique per process and thread as the same derivative can be created at once
+    # (e.g. on demand by WebUI while the service updates the store), existing targets are kept,
+    # returns if the files were created by this call and the error
+    def __create_files(
+        self, source: str, outputs: List[Tuple[Size, str]]
+    ) -> Tuple[bool, Optional[str]]:
+        if all(os.path.exists(target) for size, target in outputs):
+            return False, None  # created by other writer
+        writer = "{}{}-{}.".format(
+            self.__TEMPORARY_PREFIX, os.getpid(), threading.get_ident()
+        )  # extension stays at the end, convert picks the format from it
+        temporary = [
+            (
+                size,
+                os.path.join(
+                    os.path.dirname(target), writer + os.path.basename(target)
+                ),
+            )
+            for size, target in outputs
+        ]
+        error = self.__create(source, temporary)
+        for (size, target), (_, temporary_file) in zip(outputs, temporary):
+            if not error:
+                os.replace(temporary_file, target)  # same content, last one wins
+            elif os.path.exists(temporary_file):
+                os.remove(temporary_file)  # do not leave partial file so it is retried
+        if error and all(os.path.exists(target) for size, target in outputs):
+            return False, None  # other writer created them in the meantime
+        return not error, error
+
+    def __get_convert_options(self) -> List[str]:
+        options = ["-quality", str(self.__quality)]
+        if self.__format == self.FORMAT_JPEG:
+            options += ["-interlace", "Plane"]  # progressive JPEG
+        return options
+
+    # one convert process decodes the source and writes every size from its clone
+    def __create_with_convert(
+        self, source: str, outputs: List[Tuple[Size, str]]
+    ) -> Optional[str]:
+        arguments = [
+            self.__convert_bin_path,
+            source + self.__first_frame,
+            "-background",
+            "white",
+            "-gravity",
+            "center",
+        ]
+        for size, target in outputs:
+            box = "{}x{}".format(size.width, size.height)
+            arguments += ["(", "+clone"]
+            arguments += (
+                ["-sample", box, "-extent", box]
+                if size.pad
+                else ["-thumbnail", box + ">", "-flatten"]
+            )  # padded thumbnail like before or fitting photo that is never enlarged
+            arguments += self.__get_convert_options() + [
+                "-write",
+                target,
+                "+delete",
+                ")",
+            ]
+        arguments.append("null:")  # the source itself is not written
+        try:
+            process = subprocess.run(
+                arguments,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=self.__timeout,
+            )
+            error = (
+                process.stderr.decode(errors="replace").strip() or "convert failed"
+                if process.returncode
+                else None
+            )
+        except subprocess.TimeoutExpired:
+            error = "timed out after {} seconds".format(self.__timeout)
+        except OSError as exception:
+            error = str(exception)
+        return error
+
+    # in-process version of the convert command above, the timeout is not applied here
+    def __create_with_pillow(
+        self, source: str, outputs: List[Tuple[Size, str]]
+    ) -> Optional[str]:
+        from PIL import Image
+
+        error = None
+        try:
+            with Image.open(source) as image:
+                image.draft(
+                    "RGB",
+                    (
+                        max(size.width for size, target in outputs),
+                        max(size.height for size, target in outputs),
+                    ),
+                )  # JPEG is downscaled while decoding, no-op for other formats
+                image = image.convert(
+                    "RGBA"
+                    if image.mode in ("RGBA", "LA", "PA")
+                    or "transparency" in image.info
+                    else "RGB"
+                )
+            # every size is made from the decoded source, like from +clone in convert,
+            # so small sizes don't lose quality by resizing already resized image
+            for size, target in outputs:
+                resized = image.copy()
+                resized.thumbnail((size.width, size.height))
+                box = (size.width, size.height) if size.pad else resized.size
+                derivative = Image.new("RGB", box, "white")
+                derivative.paste(
+                    resized,
+                    ((box[0] - resized.width) // 2, (box[1] - resized.height) // 2),
+                    resized if resized.mode == "RGBA" else None,
+                )  # centering on white background like -gravity center -extent
+                derivative.save(target, **self.__get_pillow_options())
+        except Exception as exception:
+            error = str(exception) or type(exception).__name__
+        return error
+
+    def __get_pillow_options(self) -> dict:
+        if self.__format == self.FORMAT_WEBP:
+            return {"format": "WEBP", "quality": self.__quality, "method": 4}
+        return {
+            "format": "JPEG",
+            "quality": self.__quality,
+            "progressive": True,
+            "optimize": True,
+        }
@@ -0,0 +1,271 @@
+import hashlib
+import os
+import time
+from typing import List, Optional, Tuple
+from plugins.ePiSync_code_tutorial.manifestmanager import ManifestManager
+from plugins.ePiSync_code_tutorial.thumbnailmanager import ThumbnailManager
+
+
+class ThumbnailStore:
+
+    __CHUNK_SIZE = 1024 * 1024
+    __HASH_SIZE = 16  # bytes of BLAKE2b digest
+    __TOUCH_INTERVAL = 60 * 60  # seconds between last use time updates
+    __UNTRACKED_AGE = 10 * 60  # seconds, younger files may be just created
+    __UNTRACKED_INTERVAL = 24 * 60 * 60  # seconds between whole store scans
+    # photos hashed by one update, so a big sync doesn't hold the refresh for long,
+    # the rest is hashed by the next updates (or on demand by get_path)
+    __HASH_LIMIT = 200
+    __SCAN_MARKER = ".scanned"
+    # with a quota set, derivatives are created ahead only up to the first part of it
+    # and eviction frees more than needed, so the same derivatives are not removed
+    # and created again with every refresh
+    __AHEAD_RATIO = 0.8
+    __EVICTION_RATIO = 0.9
+
+    # derivatives generation and cleanup summary
+    class Stats:
+        def __init__(self):
+            self.hashed = 0
+            self.created = 0
+            self.skipped = 0
+            self.failed = 0
+            self.removed = 0
+            self.evicted = 0
+            self.errors = []
+
+        def __str__(self):
+            return (
+                "hashed: {}, created: {}, skipped: {}, failed: {}, "
+                "removed: {}, evicted: {}"
+            ).format(
+                self.hashed,
+                self.created,
+                self.skipped,
+                self.failed,
+                self.removed,
+                self.evicted,
+            )
+
+    # derivatives (thumbnail and other sizes) are kept in path as <hash[:2]>/<hash>_<size key>.<extension>
+    # where hash is the photo content hash, so duplicated and renamed photos share them,
+    # sizes are ordered from the smallest, max_size is disk quota in bytes (0 means no limit),
+    # ahead are the sizes created by update (all sizes if not given, the other ones are created
+    # on demand) and the manifest keeps content hashes and derivatives references
+    def __init__(
+        self,
+        path: str,
+        manifest: ManifestManager,
+        thumbnail_manager: ThumbnailManager,
+        sizes: List[ThumbnailManager.Size],
+        max_size: int = 0,
+        ahead: Optional[List[ThumbnailManager.Size]] = None,
+    ):
+        self.__path = path
+        self.__manifest = manifest
+        self.__thumbnail_manager = thumbnail_manager
+        self.__sizes = sizes
+        self.__max_size = max_size
+        self.__ahead = sizes if ahead is None else ahead
+
+    def __get_key(self, size: ThumbnailManager.Size) -> str:
+        return "{}.{}".format(size.get_key(), self.__thumbnail_manager.get_extension())
+
+    def __get_path(self, content_hash: str, key: str) -> str:
+        return os.path.join(
+            self.__path, content_hash[:2], "{}_{}".format(content_hash, key)
+        )
+
+    @classmethod
+    def get_hash(cls, filename: str) -> str:
+        digest = hashlib.blake2b(digest_size=cls.__HASH_SIZE)
+        with open(filename, "rb") as file:
+            for chunk in iter(lambda: file.read(cls.__CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # returns the size with the name or the smallest not padded one that covers the pixels
+    # (the longer side), None means the original photo is the best
+    def get_size(self, name: str) -> Optional[ThumbnailManager.Size]:
+        for size in self.__sizes:
+            if size.name == name:
+                return size
+        if name.isdigit():
+            for size in self.__sizes:
+                if not size.pad and max(size.width, size.height) >= int(name):
+                    return size
+        return None
+
+    # hashes new photos, generates missing derivatives of ahead sizes (newest photos first, only
+    # while they fit the quota, the rest is created on demand) and removes the ones not needed
+    def update(self) -> Stats:
+        stats = self.Stats()
+        self.__hash(self.__manifest.get_unhashed_files(self.__HASH_LIMIT), stats)
+
+        sizes = {self.__get_key(size): size for size in self.__ahead}
+        missing = self.__manifest.get_missing_thumbs(list(sizes)) if sizes else []
+        total = self.__manifest.get_thumbs_size()
+        batch = max(os.cpu_count() or 1, 1) * 4
+        for start in range(0, len(missing), batch):
+            if self.__max_size and total >= self.__max_size * self.__AHEAD_RATIO:
+                break
+            total += self.__create(
+                [
+                    (content_hash, source, [sizes[key] for key in keys])
+                    for content_hash, source, keys in missing[start : start + batch]
+                ],
+                stats,
+            )
+
+        self.collect(stats)
+        return stats
+
+    def __hash(self, files: List[str], stats: Stats):
+        hashes = []
+        for filename in files:
+            try:
+                hashes.append((filename, self.get_hash(filename)))
+            except OSError as exception:
+                stats.errors.append("{}: {}".format(filename, exception))
+        self.__manifest.set_hashes(hashes)
+        stats.hashed += len(hashes)
+
+    # creates derivatives of (hash, source, sizes) items and returns their size in bytes
+    def __create(
+        self,
+        items: List[Tuple[str, str, List[ThumbnailManager.Size]]],
+        stats: Stats,
+    ) -> int:
+        targets = {}
+        jobs = []
+        for content_hash, source, sizes in items:
+            outputs = []
+            for size in sizes:
+                key = self.__get_key(size)
+                target = self.__get_path(content_hash, key)
+                targets[target] = (content_hash, key)
+                outputs.append((size, target))
+            os.makedirs(os.path.dirname(outputs[0][1]), exist_ok=True)
+            jobs.append((source, outputs))
+
+        result = self.__thumbnail_manager.create_thumbnails(jobs)
+        total = 0
+        for target in result.thumbs:
+            try:
+                file_size = os.path.getsize(target)
+            except OSError as exception:
+                stats.errors.append("{}: {}".format(target, exception))
+                continue  # e.g. removed by cleanup in other process, created again later
+            content_hash, key = targets[target]
+            self.__manifest.add_thumb(content_hash, key, file_size)
+            total += file_size
+        stats.created += result.created
+        stats.skipped += result.skipped
+        stats.failed += result.failed
+        stats.errors += result.errors
+        return total
+
+    # returns the derivative file of the photo, creating it if needed, or None if it failed
+    def get_path(self, filename: str, size: ThumbnailManager.Size) -> Optional[str]:
+        content_hash = self.__manifest.get_hash(filename)
+        if not content_hash:
+            stats = self.Stats()
+            self.__hash([filename], stats)
+            content_hash = self.__manifest.get_hash(filename)
+            if not content_hash:
+                return None  # file is not in the manifest or can't be read
+
+        key = self.__get_key(size)
+        target = self.__get_path(content_hash, key)
+        used = self.__manifest.get_thumb(content_hash, key)
+        if used is not None and os.path.exists(target):
+            if time.time() - used > self.__TOUCH_INTERVAL:
+                self.__manifest.touch_thumb(content_hash, key)
+            return target
+
+        stats = self.Stats()
+        self.__create([(content_hash, filename, [size])], stats)
+        if not stats.created and not stats.skipped:
+            return None
+        self.__evict(stats, keep=(content_hash, key))
+        return target
+
+    # removes derivatives of photos that are gone, files not known to the manifest
+    # (e.g. left by older plugin versions) and least recently used ones above the quota
+    def collect(self, stats: Optional[Stats] = None) -> Stats:
+        stats = stats or self.Stats()
+        orphans = self.__manifest.get_orphan_thumbs()
+        self.__remove(orphans)
+        stats.removed += len(orphans)
+        stats.removed += self.__remove_untracked()
+        self.__evict(stats)
+        return stats
+
+    def __evict(self, stats: Stats, keep: Optional[Tuple[str, str]] = None):
+        if not self.__max_size:
+            return
+        total = self.__manifest.get_thumbs_size()
+        if total <= self.__max_size:
+            return
+        evicted = []
+        for content_hash, key, size in self.__manifest.get_thumbs():
+            if total <= self.__max_size * self.__EVICTION_RATIO:
+                break
+            if (content_hash, key) != keep:
+                evicted.append((content_hash, key))
+                total -= size
+        self.__remove(evicted)
+        stats.evicted += len(evicted)
+
+    def __remove(self, thumbs: List[Tuple[str, str]]):
+        for content_hash, key in thumbs:
+            try:
+                os.remove(self.__get_path(content_hash, key))
+            except OSError:
+                pass  # already removed
+        self.__manifest.remove_thumbs(thumbs)
+
+    # scans the whole store, not more often than once per interval as it is slow for big stores
+    def __remove_untracked(self) -> int:
+        marker = os.path.join(self.__path, self.__SCAN_MARKER)
+        try:
+            if time.time() - os.path.getmtime(marker) < self.__UNTRACKED_INTERVAL:
+                return 0
+        except OSError:
+            pass  # never scanned
+        known = {marker}
+        known.update(
+            self.__get_path(content_hash, key)
+            for content_hash, key, size in self.__manifest.get_thumbs()
+        )
+        limit = time.time() - self.__UNTRACKED_AGE
+        removed = 0
+        # nothing to scan if the store is not created yet
+        complete = os.path.isdir(self.__path)
+        directories = [self.__path] if complete else []
+        while directories:
+            try:
+                with os.scandir(directories.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                directories.append(entry.path)
+                            elif (
+                                entry.path not in known
+                                and entry.stat().st_mtime < limit
+                            ):
+                                os.remove(entry.path)
+                                removed += 1
+                        except FileNotFoundError:
+                            pass  # removed or replaced in the meantime
+                        except OSError:
+                            complete = False
+            except OSError:
+                complete = False
+        if complete:
+            try:
+                with open(marker, "w"):
+                    pass  # storing the scan time, the scan is repeated until it's complete
+            except OSError:
+                pass
+        return removed
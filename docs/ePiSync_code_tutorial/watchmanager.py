@@ -0,0 +1,282 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class WatchManager:
+
+    MODE_OFF = "off"
+    MODE_AUTO = "auto"  # inotify if available, polling otherwise
+    MODE_INOTIFY = "inotify"
+    MODE_POLL = "poll"
+    MODES = [MODE_OFF, MODE_AUTO, MODE_INOTIFY, MODE_POLL]
+
+    __HEARTBEAT_INTERVAL = 60  # seconds between heartbeat file updates
+    __HEARTBEAT_TIMEOUT = 3 * 60  # seconds, watcher with older heartbeat is not running
+    # pending events are passed at the latest after this many debounce times
+    __MAX_DEBOUNCE_RATIO = 10
+
+    # inotify constants from sys/inotify.h
+    __IN_ATTRIB = 0x00000004
+    __IN_CLOSE_WRITE = 0x00000008
+    __IN_MOVED_FROM = 0x00000040
+    __IN_MOVED_TO = 0x00000080
+    __IN_DELETE = 0x00000200
+    __IN_DELETE_SELF = 0x00000400
+    __IN_MOVE_SELF = 0x00000800
+    __IN_Q_OVERFLOW = 0x00004000
+    __IN_IGNORED = 0x00008000
+    __IN_ONLYDIR = 0x01000000
+    __IN_NONBLOCK = os.O_NONBLOCK
+    __IN_CLOEXEC = os.O_CLOEXEC
+    __EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+    __BUFFER_SIZE = 64 * 1024
+
+    # watches files in path (not recursively) and calls on_changes(changed, deleted) with lists
+    # of paths once events stop coming for debounce seconds, on_rescan() is called when events
+    # were lost (e.g. inotify queue overflow or watched directory replaced),
+    # heartbeat file is touched while watching so other processes know the index is kept up to date
+    def __init__(
+        self,
+        path: str,
+        on_changes: Callable[[List[str], List[str]], None],
+        on_rescan: Callable[[], None],
+        mode: str = MODE_AUTO,
+        debounce: float = 2.0,
+        poll_interval: float = 30.0,
+        heartbeat: Optional[str] = None,
+        ignored: Optional[List[str]] = None,
+        logging=None,
+    ):
+        self.__path = path
+        self.__on_changes = on_changes
+        self.__on_rescan = on_rescan
+        self.__mode = mode
+        self.__debounce = debounce
+        self.__poll_interval = poll_interval
+        self.__heartbeat = heartbeat
+        self.__ignored = ignored or []
+        self.__logging = logging
+        self.__stop_event = threading.Event()
+        self.__thread = None
+        self.__wake = None  # pipe that wakes inotify watcher up on stop
+        self.__beat = 0.0
+
+    # returns True if the heartbeat file shows that a watcher (in any process) is running
+    @classmethod
+    def is_watched(cls, heartbeat: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(heartbeat) < cls.__HEARTBEAT_TIMEOUT
+        except OSError:
+            return False
+
+    # starts watching in a background thread and returns the mode used, off if not started
+    def start(self) -> str:
+        mode = self.__mode
+        inotify = None
+        if mode in [self.MODE_AUTO, self.MODE_INOTIFY]:
+            inotify = self.__open_inotify()
+            if inotify is None:
+                if mode == self.MODE_INOTIFY:
+                    raise OSError("inotify is not available")
+                mode = self.MODE_POLL
+            else:
+                mode = self.MODE_INOTIFY
+        if mode == self.MODE_OFF:
+            return mode
+        if inotify is not None:
+            self.__wake = os.pipe()
+            target, arguments = self.__watch_inotify, (inotify,)
+        else:
+            target, arguments = self.__watch_poll, (self.__list(),)
+        self.__touch_heartbeat()
+        self.__thread = threading.Thread(
+            target=target, args=arguments, name="ePiSync watcher", daemon=True
+        )
+        self.__thread.start()
+        return mode
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__wake:
+            os.write(self.__wake[1], b"\0")
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        if self.__wake:
+            for descriptor in self.__wake:
+                os.close(descriptor)
+            self.__wake = None
+
+    def __is_ignored(self, name: str) -> bool:
+        # hidden files are temporary ones, e.g. rsync writes .<name>.<random> and renames it
+        return name.startswith(".") or name in self.__ignored
+
+    # returns inotify file descriptor watching the path or None if inotify can't be used
+    def __open_inotify(self) -> Optional[int]:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            descriptor = libc.inotify_init1(self.__IN_NONBLOCK | self.__IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if descriptor < 0:
+            return None
+        watch = libc.inotify_add_watch(
+            descriptor,
+            os.fsencode(self.__path),
+            self.__IN_CLOSE_WRITE
+            | self.__IN_MOVED_FROM
+            | self.__IN_MOVED_TO
+            | self.__IN_DELETE
+            | self.__IN_ATTRIB
+            | self.__IN_DELETE_SELF
+            | self.__IN_MOVE_SELF
+            | self.__IN_ONLYDIR,
+        )
+        if watch < 0:
+            os.close(descriptor)
+            return None  # e.g. watches limit reached or path doesn't exist
+        return descriptor
+
+    # returns changed file names and False if events were lost
+    def __read_events(self, descriptor: int) -> Tuple[List[str], bool]:
+        names = []
+        complete = True
+        try:
+            data = os.read(descriptor, self.__BUFFER_SIZE)
+        except OSError as exception:
+            if exception.errno == errno.EAGAIN:
+                return names, complete
+            raise
+        offset = 0
+        while offset + self.__EVENT.size <= len(data):
+            _, mask, _, length = self.__EVENT.unpack_from(data, offset)
+            offset += self.__EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & (
+                self.__IN_Q_OVERFLOW
+                | self.__IN_DELETE_SELF
+                | self.__IN_MOVE_SELF
+                | self.__IN_IGNORED
+            ):
+                complete = False
+            elif name:
+                names.append(os.fsdecode(name))
+        return names, complete
+
+    def __watch_inotify(self, descriptor: int):
+        pending = set()
+        first = None  # time of the first pending event
+        last = None  # time of the last event
+        try:
+            while not self.__stop_event.is_set():
+                self.__touch_heartbeat()
+                timeout = self.__debounce if pending else self.__HEARTBEAT_INTERVAL
+                ready, _, _ = select.select(
+                    [descriptor, self.__wake[0]], [], [], timeout
+                )
+                now = time.monotonic()
+                if descriptor in ready:
+                    names, complete = self.__read_events(descriptor)
+                    if not complete:
+                        # events were lost, the whole directory is scanned and watched again
+                        pending.clear()
+                        first = None
+                        os.close(descriptor)
+                        descriptor = self.__reopen()
+                        if descriptor is None:
+                            return
+                        continue
+                    names = [name for name in names if not self.__is_ignored(name)]
+                    if names:
+                        pending.update(names)
+                        first = first or now
+                        last = now
+                if pending and (
+                    now - last >= self.__debounce
+                    or now - first >= self.__debounce * self.__MAX_DEBOUNCE_RATIO
+                ):
+                    self.__flush(pending)
+                    pending = set()
+                    first = None
+        finally:
+            if descriptor is not None:
+                os.close(descriptor)
+
+    # waits until the watched directory can be watched again (e.g. it was recreated)
+    # and rescans it as events were lost
+    def __reopen(self) -> Optional[int]:
+        while not self.__stop_event.is_set():
+            descriptor = self.__open_inotify()
+            if descriptor is not None:
+                self.__call(self.__on_rescan)  # files created in the meantime
+                return descriptor
+            self.__stop_event.wait(self.__poll_interval)
+        return None
+
+    # passes pending names as existing (changed) and removed (deleted) paths
+    def __flush(self, names: set):
+        changed = []
+        deleted = []
+        for name in sorted(names):
+            path = os.path.join(self.__path, name)
+            (changed if os.path.isfile(path) else deleted).append(path)
+        self.__call(self.__on_changes, changed, deleted)
+
+    # fallback: compares directory listings, only stat is done for unchanged files
+    def __watch_poll(self, previous: Optional[Dict[str, Tuple[int, int]]]):
+        while not self.__stop_event.wait(self.__poll_interval):
+            self.__touch_heartbeat()
+            current = self.__list()
+            if current is None or previous is None:
+                previous = current
+                continue
+            changed = [
+                path for path, state in current.items() if previous.get(path) != state
+            ]
+            deleted = [path for path in previous if path not in current]
+            previous = current
+            if changed or deleted:
+                self.__call(self.__on_changes, sorted(changed), sorted(deleted))
+
+    def __list(self) -> Optional[Dict[str, Tuple[int, int]]]:
+        try:
+            with os.scandir(self.__path) as entries:
+                return {
+                    entry.path: (entry.stat().st_size, entry.stat().st_mtime_ns)
+                    for entry in entries
+                    if not self.__is_ignored(entry.name) and entry.is_file()
+                }
+        except OSError:
+            return None  # directory is not available now
+
+    def __touch_heartbeat(self):
+        now = time.time()
+        if self.__heartbeat and now - self.__beat >= self.__HEARTBEAT_INTERVAL / 2:
+            try:
+                with open(self.__heartbeat, "a"):
+                    pass
+                os.utime(self.__heartbeat)
+                self.__beat = now
+            except OSError:
+                pass  # plugin path is not writable, watcher is not announced
+
+    # watcher thread must not end because of callback error
+    def __call(self, function: Callable, *arguments):
+        try:
+            function(*arguments)
+        except Exception as exception:
+            if self.__logging:
+                self.__logging.log("ePiSync watcher error - {}".format(exception))
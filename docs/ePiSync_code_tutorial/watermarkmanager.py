@@ -0,0 +1,142 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image  # imported when the watermark is used
+
+
+class WatermarkManager:
+
+    POSITION_TOP_LEFT = "top-left"
+    POSITION_TOP_RIGHT = "top-right"
+    POSITION_BOTTOM_LEFT = "bottom-left"
+    POSITION_BOTTOM_RIGHT = "bottom-right"
+    POSITION_CENTER = "center"
+    POSITIONS = [
+        POSITION_TOP_LEFT,
+        POSITION_TOP_RIGHT,
+        POSITION_BOTTOM_LEFT,
+        POSITION_BOTTOM_RIGHT,
+        POSITION_CENTER,
+    ]
+
+    __MARGIN = 10
+    __CACHE_SIZE = 8
+    __NATIVE_MODES = ["RGB", "RGBA", "L", "LA"]  # modes that can take RGBA paste
+
+    # keeps decoded and resized watermark asset in memory
+    def __init__(self, path: str):
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__mtime = None
+        self.__source = None
+        self.__cache = {}
+
+    # returns watermark size for the frame size and scale in percents
+    @staticmethod
+    def get_size(width: int, height: int, scale: int) -> Tuple[int, int]:
+        return max(width * scale // 100, 1), max(height * scale // 100, 1)
+
+    # returns watermark position for the frame size and watermark size
+    @classmethod
+    def get_position(
+        cls, width: int, height: int, size: Tuple[int, int], position: str
+    ) -> Tuple[int, int]:
+        if position == cls.POSITION_CENTER:
+            return (width - size[0]) // 2, (height - size[1]) // 2
+        left = cls.__MARGIN
+        top = cls.__MARGIN
+        right = width - cls.__MARGIN - size[0]
+        bottom = height - cls.__MARGIN - size[1]
+        return {
+            cls.POSITION_TOP_LEFT: (left, top),
+            cls.POSITION_TOP_RIGHT: (right, top),
+            cls.POSITION_BOTTOM_LEFT: (left, bottom),
+        }.get(position, (right, bottom))
+
+    # returns the transpose method that turns frame orientation photo to its original orientation
+    @staticmethod
+    def get_transpose(rotation: int) -> int:
+        from PIL import Image
+
+        return Image.ROTATE_270 if rotation == 90 else Image.ROTATE_90
+
+    # maps watermark position from the frame (rotated) orientation to the original photo orientation
+    # where image_size is the size of not rotated photo, watermark size is in frame orientation
+    @staticmethod
+    def get_original_position(
+        position: Tuple[int, int],
+        size: Tuple[int, int],
+        image_size: Tuple[int, int],
+        rotation: int,
+    ) -> Tuple[int, int]:
+        left, top = position
+        if rotation == 90:
+            return image_size[0] - top - size[1], left
+        return top, image_size[1] - left - size[0]
+
+    # pastes RGBA watermark directly to the image without converting whole image,
+    # modes that can't take RGBA paste (e.g. 1-bit or palette) convert only the watermark region
+    @classmethod
+    def paste(
+        cls, image: Image.Image, watermark: Image.Image, position: Tuple[int, int]
+    ):
+        if image.mode in cls.__NATIVE_MODES:
+            image.paste(watermark, position, watermark)
+            return
+
+        box = (
+            position[0],
+            position[1],
+            position[0] + watermark.width,
+            position[1] + watermark.height,
+        )
+        region = image.crop(box).convert("RGBA")
+        region.alpha_composite(watermark)
+        region = (
+            region.convert("RGB").quantize(palette=image)
+            if image.mode == "P"
+            else region.convert(image.mode)
+        )  # palette images keep their own palette
+        image.paste(region, box)
+
+    # returns watermark of the size, mode and opacity (in percents),
+    # optionally transposed with Image transpose method,
+    # rebuilt only if the asset file has changed or it's not cached yet
+    def get(
+        self,
+        size: Tuple[int, int],
+        opacity: int = 100,
+        mode: str = "RGBA",
+        transpose: int = None,
+    ) -> Image.Image:
+        from PIL import Image
+
+        mtime = os.stat(self.__path).st_mtime_ns
+        key = (size, opacity, mode, transpose)
+        with self.__lock:
+            if mtime != self.__mtime:
+                with Image.open(self.__path) as image:
+                    self.__source = image.convert("RGBA")
+                self.__cache = {}
+                self.__mtime = mtime
+
+            watermark = self.__cache.get(key)
+            if watermark is None:
+                watermark = self.__source.resize(size)
+                if opacity < 100:
+                    watermark.putalpha(
+                        watermark.getchannel("A").point(
+                            lambda alpha: alpha * opacity // 100
+                        )
+                    )
+                if transpose is not None:
+                    watermark = watermark.transpose(transpose)
+                if mode != "RGBA":
+                    watermark = watermark.convert(mode)
+                if len(self.__cache) >= self.__CACHE_SIZE:
+                    self.__cache = {}  # frame size rarely changes so just start over
+                self.__cache[key] = watermark
+        return watermark
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Helper that downloads remote photos for add_photo_source_get_file ahead of time.
+# One pooled HTTP session with keep-alive is used by a small pool of workers, files are kept
+# in size-bounded on-disk cache with LRU eviction and SHA-256 checksum verification.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder):
+# from plugins.<plugin_name>.downloadmanager import DownloadManager
+# self.download_manager = DownloadManager(os.path.join(self.path, 'cache'), 200 * 1024 * 1024, logging=self.logging)
+# self.download_manager.prefetch([(photo_id, url), ...]) #photos that will be displayed next
+# cached_file = self.download_manager.get(photo_id, url) #returns at once if prefetched
+class DownloadManager:
+
+    __INDEX_NAME = "index.json"
+    __CHUNK_SIZE = 64 * 1024
+    __OK_STATUS = 200
+
+    # cache_path is a cache directory, max_size is the cache size limit in bytes,
+    # logging (plugin logger) gets errors of prefetched downloads nobody waits for
+    def __init__(
+        self,
+        cache_path: str,
+        max_size: int,
+        workers: int = 4,
+        timeout: int = 30,
+        logging=None,
+    ):
+        self.__cache_path = cache_path
+        self.__max_size = max_size
+        self.__timeout = timeout
+        self.__logging = logging
+        os.makedirs(cache_path, exist_ok=True)
+
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)  # connections are kept alive
+
+        self.__executor = ThreadPoolExecutor(max_workers=workers)
+        self.__lock = threading.Lock()
+        self.__pending = {}
+        self.__index = self.__load_index()  # oldest used entries first
+
+    def __load_index(self) -> OrderedDict:
+        try:
+            with open(os.path.join(self.__cache_path, self.__INDEX_NAME)) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = []
+        return OrderedDict(
+            (entry["key"], entry)
+            for entry in entries
+            if os.path.exists(self.__get_path(entry["key"]))
+        )
+
+    def __save_index(self):
+        path = os.path.join(self.__cache_path, self.__INDEX_NAME)
+        with open(path + ".tmp", "w") as file:
+            json.dump(list(self.__index.values()), file)
+        os.replace(path + ".tmp", path)  # never leave half written index
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.__cache_path, hashlib.sha1(key.encode()).hexdigest())
+
+    # returns cached file path of the key, downloading it if needed
+    # checksum is optional SHA-256 hex digest that the file must have
+    def get(self, key: str, url: str, checksum: Optional[str] = None) -> str:
+        path = self.__get_cached(key, checksum)
+        if path:
+            return path
+        return self.__submit(key, url, checksum).result()
+
+    def __get_cached(self, key: str, checksum: Optional[str]) -> Optional[str]:
+        with self.__lock:
+            entry = self.__index.get(key)
+            if not entry:
+                return None
+            path = self.__get_path(key)
+            try:
+                valid = os.path.getsize(path) == entry["size"] and (
+                    not checksum or checksum.lower() == entry["checksum"]
+                )
+            except OSError:
+                valid = False
+            if not valid:
+                del self.__index[key]  # file is damaged or it has changed
+                return None
+            self.__index.move_to_end(key)  # recently used
+            return path
+
+    # starts background downloads of the items (key, url) or (key, url, checksum) not cached yet
+    def prefetch(self, items: Iterable[Tuple]):
+        for item in items:
+            key, url, checksum = (tuple(item) + (None,))[:3]
+            if not self.__get_cached(key, checksum):
+                self.__submit(key, url, checksum, prefetched=True)
+
+    def __submit(
+        self, key: str, url: str, checksum: Optional[str], prefetched: bool = False
+    ) -> Future:
+        with self.__lock:
+            future = self.__pending.get(key)
+            if not future:
+                future = self.__executor.submit(self.__download, key, url, checksum)
+                self.__pending[key] = future
+                if prefetched:
+                    future.add_done_callback(self.__log_failure)
+        return future
+
+    # logs error of prefetched download, get() of the key raises it again
+    def __log_failure(self, future: Future):
+        exception = future.exception()
+        if exception and self.__logging:
+            self.__logging.log("Prefetch error - {}".format(exception))
+
+    def __download(self, key: str, url: str, checksum: Optional[str]) -> str:
+        path = self.__get_path(key)
+        temporary = path + ".part"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with self.__session.get(
+                url, stream=True, timeout=self.__timeout
+            ) as response:
+                if response.status_code != self.__OK_STATUS:
+                    raise Exception(
+                        "Download of {} failed with status {}".format(
+                            url, response.status_code
+                        )
+                    )
+                with open(temporary, "wb") as file:
+                    for chunk in response.iter_content(self.__CHUNK_SIZE):
+                        file.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            if checksum and digest.hexdigest() != checksum.lower():
+                raise Exception("Checksum of {} does not match".format(url))
+            os.replace(temporary, path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            with self.__lock:
+                self.__pending.pop(key, None)
+            raise
+
+        with self.__lock:
+            self.__pending.pop(key, None)
+            self.__index.pop(key, None)
+            self.__index[key] = {
+                "key": key,
+                "size": size,
+                "checksum": digest.hexdigest(),
+            }
+            self.__evict(key)
+            self.__save_index()
+        return path
+
+    # removes least recently used files until the cache fits the limit
+    def __evict(self, keep: str):
+        total = sum(entry["size"] for entry in self.__index.values())
+        for key in list(self.__index):
+            if total <= self.__max_size:
+                break
+            if key == keep or key in self.__pending:
+                continue
+            total -= self.__index.pop(key)["size"]
+            try:
+                os.remove(self.__get_path(key))
+            except OSError:
+                pass
+
+    # waits for running downloads, stores recent use order and closes HTTP connections
+    def close(self):
+        self.__executor.shutdown(wait=True)
+        with self.__lock:
+            self.__save_index()
+        self.__session.close()
@@ -0,0 +1,137 @@
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import wraps
+from typing import Callable, Dict
+
+
+# Opt-in helper that measures plugin hooks: wall time, CPU time and optionally tracemalloc memory peak
+# per call (memory tracing makes every allocation slower, so it's off by default and skews the timings).
+# Results are kept in a rolling buffer, written to plugin logs and can be served as JSON API.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder), at the end of __init__:
+# from plugins.<plugin_name>.hookprofiler import HookProfiler
+# self.profiler = HookProfiler(self)
+# self.profiler.install()
+# and in extend_api: WebUIManager.SiteBind('/api/<plugin_name>_hook_stats', login_required(self.profiler.get_stats_func))
+class HookProfiler:
+
+    # add_service_thread is not here as it runs for the whole service life
+    HOOKS = [
+        "add_photo_source",
+        "add_photo_source_get_file",
+        "change_photos_list",
+        "preprocess_photo",
+        "postprocess_photo",
+        "extend_api",
+        "add_website",
+        "add_action",
+    ]
+
+    # size is the number of last calls to keep, trace_memory turns on tracemalloc memory peaks
+    def __init__(
+        self, plugin, size: int = 100, trace_memory: bool = False, log: bool = True
+    ):
+        self.__plugin = plugin
+        self.__records = deque(maxlen=size)
+        self.__trace_memory = trace_memory
+        self.__log = log
+        self.__lock = threading.Lock()
+
+    # wraps all hooks implemented by the plugin class (not inherited from PluginBase)
+    def install(self) -> list:
+        from modules.base.pluginbase import PluginBase
+
+        installed = []
+        for hook in self.HOOKS:
+            method = getattr(type(self.__plugin), hook, None)
+            if method and method is not getattr(PluginBase, hook, None):
+                setattr(
+                    self.__plugin, hook, self.wrap(hook, getattr(self.__plugin, hook))
+                )
+                installed.append(hook)
+        if installed and self.__trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return installed
+
+    def wrap(self, hook: str, function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            trace = self.__trace_memory and tracemalloc.is_tracing()
+            if trace and hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()  # Python 3.9+
+            start_memory = tracemalloc.get_traced_memory()[0] if trace else 0
+            start_wall = time.perf_counter()
+            start_cpu = time.thread_time()
+            error = None
+            try:
+                return function(*args, **kwargs)
+            except Exception as exception:
+                error = str(exception)
+                raise
+            finally:
+                self.__add_record(
+                    hook,
+                    time.perf_counter() - start_wall,
+                    time.thread_time() - start_cpu,
+                    (
+                        tracemalloc.get_traced_memory()[1] - start_memory
+                        if trace
+                        else None
+                    ),
+                    error,
+                )
+
+        return wrapper
+
+    def __add_record(self, hook: str, wall: float, cpu: float, peak, error):
+        record = {
+            "hook": hook,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "peak_kb": round(peak / 1024, 1) if peak is not None else None,
+            "error": error,
+        }
+        with self.__lock:
+            self.__records.append(record)
+        if self.__log:
+            self.__plugin.logging.log(
+                "Plugin {} hook {}: wall {} ms, CPU {} ms, memory peak {} KB{}".format(
+                    self.__plugin.name,
+                    hook,
+                    record["wall_ms"],
+                    record["cpu_ms"],
+                    record["peak_kb"],
+                    ", error: " + error if error else "",
+                )
+            )
+
+    # returns summary per hook and last calls records
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            records = list(self.__records)
+        summary = {}
+        for record in records:
+            hook = summary.setdefault(
+                record["hook"], {"calls": 0, "errors": 0, "wall_ms": [], "cpu_ms": []}
+            )
+            hook["calls"] += 1
+            hook["errors"] += 1 if record["error"] else 0
+            hook["wall_ms"].append(record["wall_ms"])
+            hook["cpu_ms"].append(record["cpu_ms"])
+        for hook in summary.values():
+            for name in ["wall_ms", "cpu_ms"]:
+                values = hook.pop(name)
+                hook[name] = {
+                    "avg": round(sum(values) / len(values), 3),
+                    "max": max(values),
+                    "last": values[-1],
+                }
+        return {"plugin": self.__plugin.name, "hooks": summary, "records": records}
+
+    # API method returning JSON stats
+    def get_stats_func(self):
+        from flask import jsonify
+
+        return jsonify(self.get_stats())
@@ -0,0 +1,98 @@
+from typing import Iterator, List, Optional
+import numpy as np
+import pandas as pd
+
+
+# Helper for change_photos_list (and other photo list processing) that avoids copying the whole
+# DataFrame and boxing rows into Series: filtering with boolean masks (on categorical codes when
+# possible), sorting with a single reordering by index permutation and iteration over column arrays.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder):
+# from plugins.<plugin_name>.listtransforms import ListTransforms
+# mask = ListTransforms.get_mask(photo_list, source_label, self.SOURCE)
+# for photo_id, created in ListTransforms.iterate(photo_list, [id_label, creation_label], mask):
+# return ListTransforms.reorder(photo_list, ListTransforms.get_order(photo_list, creation_label, descending=True))
+class ListTransforms:
+
+    # returns boolean array of rows that have one of the values in the column
+    @classmethod
+    def get_mask(cls, photo_list: pd.DataFrame, column: str, values) -> np.ndarray:
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        series = photo_list[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # comparing small integer codes instead of the texts
+            codes = series.cat.categories.get_indexer(list(values))
+            return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+        if len(values) == 1:
+            return series.to_numpy() == next(iter(values))
+        return series.isin(values).to_numpy()
+
+    # converts the column to categorical in place, e.g. the source column that has few values
+    # so masks are computed on codes and the column takes less memory
+    @staticmethod
+    def set_categorical(photo_list: pd.DataFrame, column: str):
+        if not isinstance(photo_list[column].dtype, pd.CategoricalDtype):
+            photo_list[column] = photo_list[column].astype("category")
+
+    # returns row positions of the mask, can be used with reorder to filter the list
+    @staticmethod
+    def get_positions(mask: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(mask)
+
+    # returns stable sort permutation of rows by the column (optionally only masked rows)
+    # texts like creation time are sorted as fixed width strings which is much faster than objects
+    @classmethod
+    def get_order(
+        cls,
+        photo_list: pd.DataFrame,
+        column: str,
+        descending: bool = False,
+        mask: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        values = cls.__get_sortable(photo_list[column])
+        positions = np.arange(len(values)) if mask is None else np.flatnonzero(mask)
+        if mask is not None:
+            values = values[positions]
+        if descending:
+            # sorting reversed values keeps the original order of equal ones, like sort_values does
+            order = len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]
+        else:
+            order = np.argsort(values, kind="stable")
+        return positions[order]
+
+    @staticmethod
+    def __get_sortable(series: pd.Series) -> np.ndarray:
+        if isinstance(series.dtype, pd.CategoricalDtype) and series.cat.ordered:
+            return series.cat.codes.to_numpy()
+        values = series.to_numpy()
+        if values.dtype == object and pd.api.types.infer_dtype(values) == "string":
+            return values.astype(str)
+        return values
+
+    # returns the list with rows in the order of positions (permutation or filtered positions)
+    # with one copy of the data, index is reset in place so photo_manager.reset_index is not needed
+    @staticmethod
+    def reorder(
+        photo_list: pd.DataFrame, positions: np.ndarray, reset_index: bool = True
+    ) -> pd.DataFrame:
+        result = photo_list.take(positions)
+        if reset_index:
+            result.index = pd.RangeIndex(len(result))
+        return result
+
+    # returns the columns as arrays (optionally only masked rows) without copying the DataFrame
+    @staticmethod
+    def get_columns(
+        photo_list: pd.DataFrame, columns: List[str], mask: Optional[np.ndarray] = None
+    ) -> List[np.ndarray]:
+        arrays = [photo_list[column].to_numpy() for column in columns]
+        return arrays if mask is None else [array[mask] for array in arrays]
+
+    # iterates over rows as plain tuples of the column values, replacement of iterrows()
+    @classmethod
+    def iterate(
+        cls,
+        photo_list: pd.DataFrame,
+        columns: List[str],
+        mask: Optional[np.ndarray] = None,
+    ) -> Iterator[tuple]:
+        return zip(*cls.get_columns(photo_list, columns, mask))
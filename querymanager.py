@@ -0,0 +1,228 @@
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+
+# Helper for plugin API data (e.g. get_data_func in extend_api) with SQLite database: connections
+# are reused from a thread-safe pool, only named queries with bound parameters are run (request
+# can't pass SQL), results are cached with TTL and LRU limit until invalidated by write queries
+# and big results are streamed as JSON without loading all rows to memory.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder), in __init__:
+# from plugins.<plugin_name>.querymanager import QueryManager
+# self.queries = QueryManager(os.path.join(self.path, 'data.db'), {
+# 	'readings': QueryManager.Query('SELECT time, value FROM readings WHERE sensor = :sensor LIMIT :limit', {'limit': int}),
+# 	'add_reading': 'INSERT INTO readings (time, sensor, value) VALUES (:time, :sensor, :value)',
+# })
+# rows = self.queries.query('readings', sensor='outside', limit=10)
+# self.queries.execute('add_reading', time=now, sensor='outside', value=21.5) #clears cached results
+# and in extend_api: WebUIManager.SiteBind('/api/get_data', login_required(self.queries.get_data_func))
+class QueryManager:
+
+    __PARAMETER = re.compile(r"(?<!:):([A-Za-z_]\w*)")  # :name, not ::
+    __CHUNK_SIZE = 500  # rows fetched at once while streaming
+
+    # named query, types convert request parameters (strings) e.g. {'limit': int},
+    # streamed results are sent as JSON stream and not cached, ttl overrides the default one
+    class Query:
+        def __init__(
+            self,
+            sql: str,
+            types: Optional[Dict[str, Callable]] = None,
+            streamed: bool = False,
+            ttl: Optional[float] = None,
+        ):
+            self.sql = sql
+            self.types = types or {}
+            self.streamed = streamed
+            self.ttl = ttl
+            self.parameters = []
+
+    # path is the database file or SQLite URI (e.g. 'file:data?mode=memory&cache=shared'),
+    # queries map names to SQL or Query objects,
+    # pool_size limits open connections, cache_size is the number of cached results
+    # and ttl is their lifetime in seconds (0 disables cache)
+    def __init__(
+        self,
+        path: str,
+        queries: Dict[str, Union[str, Query]],
+        pool_size: int = 4,
+        cache_size: int = 128,
+        ttl: float = 30,
+        timeout: float = 30,
+    ):
+        self.__path = path
+        self.__timeout = timeout
+        self.__queries = {}
+        for name, query in queries.items():
+            query = query if isinstance(query, self.Query) else self.Query(query)
+            query.parameters = list(
+                OrderedDict.fromkeys(self.__PARAMETER.findall(query.sql))
+            )
+            self.__queries[name] = query
+        self.__pool = queue.LifoQueue()  # the most recently used connection is warm
+        self.__slots = threading.BoundedSemaphore(pool_size)
+        self.__cache_size = cache_size
+        self.__ttl = ttl
+        self.__cache = OrderedDict()  # least recently used results first
+        self.__cache_lock = threading.Lock()
+        self.__generation = 0  # bumped by invalidate, stale results are not cached
+
+    def get_names(self) -> List[str]:
+        return list(self.__queries)
+
+    def __get_query(self, name: str) -> Query:
+        query = self.__queries.get(name)
+        if query is None:
+            raise KeyError("Unknown query: {}".format(name))
+        return query
+
+    # returns pooled connection, waits when all of them are used,
+    # read only connection can't change the database even with write query
+    @contextmanager
+    def __connection(self, read_only: bool = True) -> Iterator[sqlite3.Connection]:
+        if not self.__slots.acquire(timeout=self.__timeout):
+            raise TimeoutError("No free database connection")
+        try:
+            try:
+                connection = self.__pool.get_nowait()
+            except queue.Empty:
+                connection = sqlite3.connect(
+                    self.__path,
+                    timeout=self.__timeout,
+                    uri=self.__path.startswith("file:"),
+                    check_same_thread=False,  # used by one thread at a time
+                    cached_statements=max(len(self.__queries), 16),
+                )  # statements are prepared once per connection
+            try:
+                connection.execute("PRAGMA query_only = {}".format(int(read_only)))
+                yield connection
+            except sqlite3.Error:
+                connection.close()  # may be broken
+                raise
+            except BaseException:
+                connection.rollback()
+                self.__pool.put(connection)
+                raise
+            else:
+                self.__pool.put(connection)
+        finally:
+            self.__slots.release()
+
+    # returns rows of the query as list of dictionaries, cached as tuples so every call
+    # gets its own dictionaries and changing them doesn't change the cached result
+    def query(self, name: str, **parameters) -> List[Dict]:
+        query = self.__get_query(name)
+        ttl = self.__ttl if query.ttl is None else query.ttl
+        key = (name, tuple(sorted(parameters.items())))
+        if ttl:
+            with self.__cache_lock:
+                entry = self.__cache.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self.__cache.move_to_end(key)
+                    return self.__to_dicts(entry[1], entry[2])
+                generation = self.__generation
+
+        with self.__connection() as connection:
+            cursor = connection.execute(query.sql, parameters)
+            columns = tuple(column[0] for column in cursor.description or [])
+            rows = tuple(cursor.fetchall())
+
+        if ttl:
+            with self.__cache_lock:
+                if generation == self.__generation:  # not invalidated while reading
+                    self.__cache[key] = (time.monotonic() + ttl, columns, rows)
+                    self.__cache.move_to_end(key)
+                    while len(self.__cache) > self.__cache_size:
+                        self.__cache.popitem(last=False)
+        return self.__to_dicts(columns, rows)
+
+    @staticmethod
+    def __to_dicts(columns: tuple, rows: tuple) -> List[Dict]:
+        return [dict(zip(columns, row)) for row in rows]
+
+    # runs write query (or many of them for list of parameter dictionaries), commits it
+    # and invalidates cached results, returns number of changed rows
+    def execute(
+        self, name: str, many: Optional[List[Dict]] = None, **parameters
+    ) -> int:
+        query = self.__get_query(name)
+        with self.__connection(read_only=False) as connection:
+            with connection:  # commits or rolls back
+                count = (
+                    connection.executemany(query.sql, many)
+                    if many is not None
+                    else connection.execute(query.sql, parameters)
+                ).rowcount
+        self.invalidate()
+        return count
+
+    # removes cached results of the query or all of them
+    def invalidate(self, name: Optional[str] = None):
+        with self.__cache_lock:
+            self.__generation += 1
+            if name is None:
+                self.__cache.clear()
+            else:
+                for key in [key for key in self.__cache if key[0] == name]:
+                    del self.__cache[key]
+
+    # yields JSON document {"columns": [...], "rows": [[...], ...]} in parts,
+    # rows are fetched in chunks while sending
+    def stream_json(self, name: str, **parameters) -> Iterator[str]:
+        query = self.__get_query(name)
+        with self.__connection() as connection:
+            cursor = connection.execute(query.sql, parameters)
+            columns = [column[0] for column in cursor.description or []]
+            yield '{{"columns": {}, "rows": ['.format(json.dumps(columns))
+            separator = ""
+            while True:
+                rows = cursor.fetchmany(self.__CHUNK_SIZE)
+                if not rows:
+                    break
+                yield separator + ",".join(json.dumps(row) for row in rows)
+                separator = ","
+            yield "]}"
+
+    # returns query parameters converted from strings with query types, KeyError if missing
+    def get_parameters(self, name: str, values: Dict[str, str]) -> Dict:
+        query = self.__get_query(name)
+        return {
+            parameter: query.types.get(parameter, str)(values[parameter])
+            for parameter in query.parameters
+        }
+
+    # API method called with ?query=<name>&<parameter>=<value>...
+    # returns JSON with rows of the query or streams it for streamed queries,
+    # write queries fail as API connections are read only
+    def get_data_func(self):
+        from flask import Response, jsonify, request
+
+        name = request.args.get("query", str())
+        if name not in self.__queries:
+            return jsonify(error="Unknown query"), 404
+        try:
+            parameters = self.get_parameters(name, request.args)
+        except KeyError as exception:
+            return jsonify(error="Missing parameter: {}".format(exception.args[0])), 400
+        except ValueError as exception:
+            return jsonify(error=str(exception)), 400
+
+        if self.__queries[name].streamed:
+            return Response(
+                self.stream_json(name, **parameters), mimetype="application/json"
+            )
+        return jsonify(rows=self.query(name, **parameters))
+
+    # closes idle connections, e.g. when the plugin is stopped
+    def close(self):
+        while True:
+            try:
+                self.__pool.get_nowait().close()
+            except queue.Empty:
+                break
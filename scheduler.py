@@ -0,0 +1,293 @@
+import datetime
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+_shared_lock = threading.Lock()  # guards creating the shared scheduler
+
+
+# Helper for add_service_thread that runs periodic and cron-like tasks of all plugins on one timer heap
+# with a small pool of workers, instead of a permanently sleeping thread per plugin.
+# Tasks have optional jitter (spreads tasks of many plugins), deadline (run is skipped when it can't
+# start in time) and are never run twice at once. backend.refresh() calls are coalesced
+# and the scheduler waits for the stop event (or the next task), not blindly sleeping.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder), in add_service_thread:
+# from plugins.<plugin_name>.scheduler import Scheduler
+# scheduler = Scheduler.get_shared(service, backend, self.logging)
+# scheduler.add_task('<plugin_name>_stats', self.feed_stats, interval=60, jitter=5, refresh=True)
+# scheduler.run()  # returns at once when other plugin thread is already running the scheduler
+class Scheduler:
+
+    __SHARED_NAME = "plugins_scheduler"  # service attribute with shared scheduler
+    __REFRESH_INTERVAL = 5  # seconds, closer backend.refresh() calls are coalesced
+    __CRON_YEARS = 5  # next cron time is searched that far
+
+    # cron-like schedule: minute hour day month weekday (0 or 7 is Sunday),
+    # fields can be *, numbers, lists, ranges and steps, e.g. '*/15 6-22 * * 1-5'
+    class Cron:
+        __RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+        def __init__(self, expression: str):
+            fields = expression.split()
+            if len(fields) != 5:
+                raise ValueError("Cron expression needs 5 fields: " + expression)
+            (
+                self.minutes,
+                self.hours,
+                self.days,
+                self.months,
+                self.weekdays,
+            ) = [
+                self.__parse(field, *limits)
+                for field, limits in zip(fields, self.__RANGES)
+            ]
+            if 7 in self.weekdays:
+                self.weekdays.add(0)
+            # like in cron, when both days and weekdays are restricted either of them matches
+            self.__any_day = fields[2] == "*" or fields[4] == "*"
+
+        @staticmethod
+        def __parse(field: str, first: int, last: int) -> set:
+            values = set()
+            for part in field.split(","):
+                value_range, _, step = part.partition("/")
+                if value_range == "*":
+                    start, end = first, last
+                elif "-" in value_range:
+                    start, end = [int(value) for value in value_range.split("-", 1)]
+                else:
+                    start = end = int(value_range)
+                    if step:
+                        end = last  # e.g. 5/15 means 5, 20, 35, 50
+                if start < first or end > last or start > end:
+                    raise ValueError("Cron value out of range: " + field)
+                values.update(range(start, end + 1, int(step) if step else 1))
+            return values
+
+        def __is_day(self, date: datetime.datetime) -> bool:
+            day = date.day in self.days
+            weekday = (date.weekday() + 1) % 7 in self.weekdays  # cron Sunday is 0
+            return day and weekday if self.__any_day else day or weekday
+
+        # returns the next matching time (local) after the timestamp
+        def get_next(self, timestamp: float, years: int = 5) -> Optional[float]:
+            date = datetime.datetime.fromtimestamp(timestamp).replace(
+                second=0, microsecond=0
+            ) + datetime.timedelta(minutes=1)
+            limit = date + datetime.timedelta(days=366 * years)
+            while date < limit:
+                if date.month not in self.months:
+                    date = (date.replace(day=1) + datetime.timedelta(days=32)).replace(
+                        day=1, hour=0, minute=0
+                    )
+                elif not self.__is_day(date):
+                    date = date.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                elif date.hour not in self.hours:
+                    date = date.replace(minute=0) + datetime.timedelta(hours=1)
+                elif date.minute not in self.minutes:
+                    date += datetime.timedelta(minutes=1)
+                else:
+                    return date.timestamp()
+            return None  # e.g. 31st of February
+
+    # scheduled task with its statistics
+    class Task:
+        def __init__(
+            self,
+            name: str,
+            function: Callable,
+            interval: float,
+            cron,
+            jitter: float,
+            deadline: Optional[float],
+            refresh: bool,
+        ):
+            self.name = name
+            self.function = function
+            self.interval = interval
+            self.cron = cron
+            self.jitter = jitter
+            self.deadline = deadline
+            self.refresh = refresh
+            self.due = 0.0
+            self.running = False
+            self.removed = False
+            self.runs = 0
+            self.skipped = 0
+            self.failures = 0
+            self.last_duration = None
+
+        def get_stats(self) -> Dict:
+            return {
+                "due": self.due,
+                "running": self.running,
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "failures": self.failures,
+                "last_duration": self.last_duration,
+            }
+
+    # workers is the number of tasks running at once, backend is used for coalesced refresh
+    def __init__(self, backend=None, logging=None, workers: int = 2):
+        self.__backend = backend
+        self.__logging = logging
+        self.__workers = workers
+        self.__tasks = {}
+        self.__heap = []
+        self.__counter = itertools.count()  # heap order of tasks with the same time
+        self.__condition = threading.Condition()
+        self.__stop_event = threading.Event()
+        self.__running = False
+        self.__refresh_lock = threading.Lock()
+        self.__refreshed = 0.0
+
+    # returns scheduler shared by all plugins of the service (created by the first plugin)
+    @classmethod
+    def get_shared(cls, service, backend=None, logging=None, workers: int = 2):
+        with _shared_lock:
+            scheduler = service.__dict__.get(cls.__SHARED_NAME)
+            if scheduler is None:
+                # setdefault keeps scheduler created by other copy of this helper
+                scheduler = service.__dict__.setdefault(
+                    cls.__SHARED_NAME, cls(backend, logging, workers)
+                )
+            return scheduler
+
+    # adds the task run every interval seconds (first run after delay) or at cron expression times,
+    # with random delay up to jitter seconds, skipped if it can't start deadline seconds after its time
+    # or the previous run is still running, refresh runs coalesced backend.refresh() before the task,
+    # function may return number of seconds to the next run (e.g. for backoff)
+    def add_task(
+        self,
+        name: str,
+        function: Callable,
+        interval: float = 0,
+        cron: str = str(),
+        jitter: float = 0,
+        deadline: Optional[float] = None,
+        refresh: bool = False,
+        delay: float = 0,
+    ):
+        if not interval and not cron:
+            raise ValueError("Task {} needs interval or cron".format(name))
+        task = self.Task(
+            name,
+            function,
+            interval,
+            self.Cron(cron) if cron else None,
+            jitter,
+            deadline,
+            refresh,
+        )
+        with self.__condition:
+            if name in self.__tasks:
+                self.__tasks[name].removed = True  # replaced
+            self.__tasks[name] = task
+            self.__schedule(task, time.time(), delay if interval else None)
+            self.__condition.notify()
+
+    def remove_task(self, name: str):
+        with self.__condition:
+            task = self.__tasks.pop(name, None)
+            if task:
+                task.removed = True
+
+    def __schedule(self, task: Task, now: float, delay: Optional[float] = None):
+        if delay is not None:
+            due = now + delay
+        elif task.cron:
+            due = task.cron.get_next(now, self.__CRON_YEARS)
+            if due is None:
+                self.__tasks.pop(task.name, None)
+                return  # never matches
+        else:
+            due = now + task.interval
+        task.due = due + (random.uniform(0, task.jitter) if task.jitter else 0)
+        heapq.heappush(self.__heap, (task.due, next(self.__counter), task))
+
+    # runs the scheduler until stop, returns at once if it is already running in other thread
+    def run(self):
+        with self.__condition:
+            if self.__running:
+                return
+            self.__running = True
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            while not self.__stop_event.is_set():
+                with self.__condition:
+                    due = self.__get_due()
+                    if not due:
+                        self.__condition.wait(
+                            self.__heap[0][0] - time.time() if self.__heap else None
+                        )  # woken by new task or stop
+                        continue
+                for task in due:
+                    executor.submit(self.__run_task, task)
+        with self.__condition:
+            self.__running = False
+
+    # pops tasks that are due, skipping removed, running and too late ones
+    def __get_due(self) -> List[Task]:
+        now = time.time()
+        due = []
+        while self.__heap and self.__heap[0][0] <= now:
+            task_due, _, task = heapq.heappop(self.__heap)
+            if task.removed or task_due != task.due:
+                continue  # removed or rescheduled
+            late = task.deadline is not None and now - task.due > task.deadline
+            self.__schedule(task, now)  # next run time doesn't depend on run duration
+            if task.running or late:
+                task.skipped += 1  # previous run is still running or it's too late
+                continue
+            task.running = True
+            due.append(task)
+        return due
+
+    def __run_task(self, task: Task):
+        start = time.time()
+        delay = None
+        try:
+            if task.refresh:
+                self.refresh()
+            result = task.function()
+            if isinstance(result, (int, float)) and not isinstance(result, bool):
+                delay = result
+        except Exception as exception:
+            task.failures += 1
+            if self.__logging:
+                self.__logging.log("Task {} error - {}".format(task.name, exception))
+        task.runs += 1
+        task.last_duration = time.time() - start
+        with self.__condition:
+            task.running = False
+            if delay is not None and not task.removed:
+                self.__schedule(task, time.time(), delay)
+                self.__condition.notify()
+
+    # calls backend.refresh() (checks if frame configuration changed and reloads it)
+    # unless it was called by other task a moment ago
+    def refresh(self):
+        if not self.__backend:
+            return
+        with self.__refresh_lock:
+            if time.time() - self.__refreshed >= self.__REFRESH_INTERVAL:
+                self.__backend.refresh()
+                self.__refreshed = time.time()
+
+    # waits for the stop event up to timeout seconds, returns True if the scheduler is stopping,
+    # for long tasks that need to pause
+    def wait(self, timeout: float) -> bool:
+        return self.__stop_event.wait(timeout)
+
+    def stop(self):
+        self.__stop_event.set()
+        with self.__condition:
+            self.__condition.notify_all()
+
+    # returns statistics of the tasks
+    def get_stats(self) -> Dict:
+        with self.__condition:
+            return {name: task.get_stats() for name, task in self.__tasks.items()}
@@ -0,0 +1,99 @@
+import os
+from typing import List
+import numpy as np
+import pandas as pd
+
+
+# Helper that builds photo source DataFrame for add_photo_source without intermediate Python lists.
+# Directory entries are streamed with os.scandir into preallocated arrays, creation dates are kept
+# as datetime64 and the source column is categorical.
+# Usage inside the plugin (<plugin_name> is the name of the plugin folder):
+# from plugins.<plugin_name>.sourcebuilder import SourceBuilder
+# builder = SourceBuilder(id_label, creation_label, source_label, self.SOURCE)
+# return builder.from_directory('path_to_photos', Constants.EXTENSIONS)
+class SourceBuilder:
+
+    DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"  # creation time format expected by ePiframe
+
+    __INITIAL_CAPACITY = 1024
+
+    def __init__(
+        self, id_label: str, creation_label: str, source_label: str, source: str
+    ):
+        self.__id_label = id_label
+        self.__creation_label = creation_label
+        self.__source_label = source_label
+        self.__source = source
+
+    # collects photos (by extension) from path with file modification time as creation time
+    # as_text=False keeps creation time as datetime64 column (UTC) instead of ePiframe text format,
+    # use it only if the DataFrame is processed by the plugin itself as other sources use text
+    def from_directory(
+        self,
+        path: str,
+        extensions: List[str],
+        recursive: bool = False,
+        as_text: bool = True,
+    ) -> pd.DataFrame:
+        suffixes = tuple(
+            "." + extension.lower().lstrip(".") for extension in extensions
+        )
+        capacity = self.__INITIAL_CAPACITY
+        ids = np.empty(capacity, dtype=object)
+        times = np.empty(capacity, dtype=np.int64)
+        count = 0
+        directories = [path]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if recursive and entry.is_dir():
+                        directories.append(entry.path)
+                    elif entry.name.lower().endswith(suffixes) and entry.is_file():
+                        if count == capacity:  # growing arrays only when full
+                            capacity *= 2
+                            ids.resize(capacity, refcheck=False)
+                            times.resize(capacity, refcheck=False)
+                        ids[count] = entry.path
+                        times[count] = entry.stat().st_mtime_ns
+                        count += 1
+        return self.__build(
+            ids[:count], pd.to_datetime(times[:count], unit="ns"), as_text
+        )
+
+    # builds DataFrame from photo ids and creation dates (datetime64 values, timestamps in seconds
+    # or texts in ePiframe format), replacement of pd.DataFrame(list(zip(ids, dates)))
+    def from_arrays(self, ids, dates, as_text: bool = True) -> pd.DataFrame:
+        dates = np.asarray(dates)
+        dates = (
+            pd.to_datetime(dates, unit="s")
+            if np.issubdtype(dates.dtype, np.number)
+            else (
+                pd.to_datetime(dates, format=self.DATE_FORMAT)
+                if dates.dtype.kind in "OSU"
+                else pd.to_datetime(dates)
+            )
+        )
+        return self.__build(np.asarray(ids, dtype=object), dates, as_text)
+
+    def __build(
+        self, ids: np.ndarray, dates: pd.DatetimeIndex, as_text: bool
+    ) -> pd.DataFrame:
+        if dates.tz is not None:
+            dates = dates.tz_convert(None)  # naive UTC
+        return pd.DataFrame(
+            {
+                self.__id_label: ids,
+                self.__creation_label: self.__to_text(dates) if as_text else dates,
+                self.__source_label: pd.Categorical.from_codes(
+                    np.zeros(len(ids), dtype=np.int8), categories=[self.__source]
+                ),
+            },
+            copy=False,
+        )
+
+    # formats dates as DATE_FORMAT in one numpy call, strftime formats them one by one
+    @staticmethod
+    def __to_text(dates: pd.DatetimeIndex) -> np.ndarray:
+        return np.datetime_as_string(dates.values, unit="s", timezone="UTC").astype(
+            object
+        )